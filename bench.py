@@ -0,0 +1,479 @@
+"""Offline benchmarks for the security listeners.
+
+Builds fake guilds, members, messages and audit log entries, replays
+synthetic scenarios straight into the SecurityFeature and PremiumSecurity
+listeners with every REST call stubbed out, and reports throughput,
+p50/p99 handler latency and peak traced memory per scenario.
+
+    python bench.py                      # every scenario
+    python bench.py raid nuke            # selected scenarios
+    python bench.py --json before.json   # keep results to compare runs
+
+Storage runs in a scratch directory so the real data files are never touched.
+"""
+import argparse
+import asyncio
+import gc
+import itertools
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
+os.environ["SECUREAURA_STORAGE"] = "json"
+os.chdir(tempfile.mkdtemp(prefix="secureaura-bench-"))
+
+import discord
+from cogs.security_feature import SecurityFeature, ANTINUKE, ANTIBOTADD, ANTIRAID
+from cogs.premium_security import PremiumSecurity, PREMIUM_BITS, premium_registry
+from utils.links import blocklist
+
+REST_LATENCY = 0.0   # seconds added to every stubbed REST call, set by --rest-latency
+_ids = itertools.count(1_100_000_000_000_000_000)
+
+def snowflake():
+    return next(_ids)
+
+async def rest():
+    if REST_LATENCY:
+        await asyncio.sleep(REST_LATENCY)
+    else:
+        await asyncio.sleep(0)
+
+# ------------ FAKE DISCORD OBJECTS ------------
+class FakeRole:
+    __slots__ = ("id", "guild", "name", "position")
+
+    def __init__(self, guild, name, position):
+        self.id = snowflake()
+        self.guild = guild
+        self.name = name
+        self.position = position
+
+    def __ge__(self, other):
+        return self.position >= other.position
+
+    def __lt__(self, other):
+        return self.position < other.position
+
+class FakeMember:
+    __slots__ = ("id", "guild", "bot", "top_role", "name")
+
+    def __init__(self, guild, top_role, bot=False):
+        self.id = snowflake()
+        self.guild = guild
+        self.bot = bot
+        self.top_role = top_role
+        self.name = f"user{self.id % 100000}"
+
+    @property
+    def mention(self):
+        return f"<@{self.id}>"
+
+    async def timeout(self, until, **kwargs):
+        await rest()
+
+    async def send(self, **kwargs):
+        await rest()
+
+class FakeChannel:
+    __slots__ = ("id", "guild", "name")
+
+    def __init__(self, guild, name):
+        self.id = snowflake()
+        self.guild = guild
+        self.name = name
+
+    @property
+    def mention(self):
+        return f"<#{self.id}>"
+
+    def permissions_for(self, member):
+        return discord.Permissions.all()
+
+    async def send(self, **kwargs):
+        await rest()
+
+class FakeBulkBan:
+    __slots__ = ("banned", "failed")
+
+    def __init__(self, users):
+        self.banned = [discord.Object(u.id) for u in users]
+        self.failed = []
+
+class FakeGuild:
+    def __init__(self, name="bench", members=0):
+        self.id = snowflake()
+        self.name = name
+        self.default_role = FakeRole(self, "@everyone", 0)
+        self.member_role = FakeRole(self, "member", 1)
+        self.bot_role = FakeRole(self, "SecureAura", 100)
+        self.me = FakeMember(self, self.bot_role, bot=True)
+        self.owner = FakeMember(self, FakeRole(self, "owner", 200))
+        self.owner_id = self.owner.id
+        self.icon = None
+        self._members = {self.me.id: self.me, self.owner.id: self.owner}
+        self._channels = {}
+        self.add_members(members)
+        self.add_channel("logs")
+        self.add_channel("premium-logs")
+
+    def add_members(self, count):
+        added = []
+        for _ in range(count):
+            member = FakeMember(self, self.member_role)
+            self._members[member.id] = member
+            added.append(member)
+        return added
+
+    def add_channel(self, name):
+        channel = FakeChannel(self, name)
+        self._channels[channel.id] = channel
+        return channel
+
+    @property
+    def members(self):
+        return list(self._members.values())
+
+    @property
+    def member_count(self):
+        return len(self._members)
+
+    @property
+    def text_channels(self):
+        return list(self._channels.values())
+
+    def get_member(self, user_id):
+        return self._members.get(user_id)
+
+    def get_channel(self, channel_id):
+        return self._channels.get(channel_id)
+
+    async def fetch_member(self, user_id):
+        await rest()
+        member = self._members.get(user_id)
+        if member is None:
+            raise discord.NotFound(_FakeResponse(404), "Unknown Member")
+        return member
+
+    async def ban(self, user, **kwargs):
+        await rest()
+        self._members.pop(user.id, None)
+
+    async def kick(self, user, **kwargs):
+        await rest()
+        self._members.pop(user.id, None)
+
+    async def bulk_ban(self, users, **kwargs):
+        await rest()
+        for user in users:
+            self._members.pop(user.id, None)
+        return FakeBulkBan(users)
+
+    async def create_text_channel(self, name, **kwargs):
+        await rest()
+        return self.add_channel(name)
+
+    async def audit_logs(self, **kwargs):
+        await rest()
+        return
+        yield
+
+class _FakeResponse:
+    def __init__(self, status):
+        self.status = status
+        self.reason = ""
+
+class FakeAuditLogEntry:
+    __slots__ = ("id", "guild", "action", "user", "target", "created_at")
+
+    def __init__(self, guild, action, user, target):
+        self.id = snowflake()
+        self.guild = guild
+        self.action = action
+        self.user = user
+        self.target = target
+        self.created_at = discord.utils.utcnow()
+
+class FakeMessage:
+    __slots__ = ("id", "guild", "author", "channel", "content", "mentions", "attachments")
+
+    def __init__(self, author, channel, content, mentions=()):
+        self.id = snowflake()
+        self.guild = channel.guild
+        self.author = author
+        self.channel = channel
+        self.content = content
+        self.mentions = list(mentions)
+        self.attachments = []
+
+    async def delete(self):
+        await rest()
+
+class FakeRawDelete:
+    __slots__ = ("guild_id", "message_id", "channel_id")
+
+    def __init__(self, message):
+        self.guild_id = message.guild.id
+        self.message_id = message.id
+        self.channel_id = message.channel.id
+
+class FakeBot:
+    """Just enough of commands.Bot for the cogs to construct and run."""
+
+    def __init__(self, guilds):
+        self.shard_count = None
+        self.shard_ids = None
+        self.guilds = guilds
+        self._guilds = {g.id: g for g in guilds}
+        self.listeners = {}
+
+    def add_listener(self, func, name=None):
+        self.listeners.setdefault(name or func.__name__, []).append(func)
+
+    def get_guild(self, guild_id):
+        return self._guilds.get(guild_id)
+
+    def get_channel(self, channel_id):
+        return None
+
+    def is_ready(self):
+        return False
+
+    async def dispatch_extra(self, event, *args):
+        # Listeners the utils register with bot.add_listener (audit cache, resolvers)
+        for func in self.listeners.get(event, ()):
+            await func(*args)
+
+# ------------ SCENARIOS ------------
+class Run:
+    def __init__(self, bot):
+        self.bot = bot
+        self.security = SecurityFeature(bot)
+        self.premium = PremiumSecurity(bot)
+        # Expiry handling would rewrite the scratch premium table; not measured here
+        self.premium.cog_unload()
+        self.latencies = []
+        self.started = None   # first replayed event, so fixture setup is not timed
+
+    async def call(self, handler, *args):
+        start = time.perf_counter()
+        if self.started is None:
+            self.started = start
+        await handler(*args)
+        self.latencies.append(time.perf_counter() - start)
+
+    def enable_premium(self, guild, *features):
+        mask = 0
+        for key in features:
+            mask |= PREMIUM_BITS[key]
+        premium_registry.apply(guild.id, {
+            "activated_by": 0,
+            "activated_on": datetime.utcnow().isoformat(),
+            "duration": "30d",
+            "expires_on": (datetime.utcnow() + timedelta(days=30)).isoformat(),
+            "features": mask,
+        })
+
+async def raid(run, scale):
+    """10k accounts join one guild back to back with anti-raid on."""
+    guild = FakeGuild("raid", members=1000)
+    run.bot._guilds[guild.id] = guild
+    run.security.settings.set(guild.id, ANTIRAID, True)
+    for member in guild.add_members(int(10_000 * scale)):
+        await run.call(run.security.on_member_join, member)
+
+async def nuke(run, scale):
+    """One compromised admin deletes 500 channels and then mass-bans."""
+    guild = FakeGuild("nuke", members=5000)
+    run.bot._guilds[guild.id] = guild
+    run.security.settings.set(guild.id, ANTINUKE | ANTIBOTADD, True)
+    attacker = FakeMember(guild, FakeRole(guild, "admin", 50))
+    guild._members[attacker.id] = attacker
+    channels = [guild.add_channel(f"channel-{i}") for i in range(int(500 * scale))]
+    for channel in channels:
+        del guild._channels[channel.id]
+        entry = FakeAuditLogEntry(guild, discord.AuditLogAction.channel_delete, attacker, channel)
+        await run.bot.dispatch_extra("on_audit_log_entry_create", entry)
+        await run.call(run.security.on_audit_log_entry_create, entry)
+        await run.call(run.security.on_guild_channel_delete, channel)
+    victims = list(guild._members.values())[:int(500 * scale)]
+    for victim in victims:
+        entry = FakeAuditLogEntry(guild, discord.AuditLogAction.ban, attacker, victim)
+        await run.bot.dispatch_extra("on_audit_log_entry_create", entry)
+        await run.call(run.security.on_audit_log_entry_create, entry)
+
+async def spam(run, scale, realtime=False):
+    """50 messages/s from a handful of spammers among normal chatter."""
+    guild = FakeGuild("spam", members=2000)
+    run.bot._guilds[guild.id] = guild
+    run.enable_premium(guild, "spam", "ghost_ping")
+    channels = [guild.add_channel(f"chat-{i}") for i in range(5)]
+    people = list(guild._members.values())[2:]
+    spammers = people[:5]
+    rng = random.Random(20)
+    for i in range(int(2_500 * scale)):
+        author = rng.choice(spammers) if rng.random() < 0.6 else rng.choice(people)
+        mentions = [rng.choice(people)] if rng.random() < 0.1 else []
+        message = FakeMessage(author, rng.choice(channels), "free nitro http://example.com", mentions)
+        await run.call(run.premium.on_message, message)
+        if mentions and rng.random() < 0.5:
+            await run.call(run.premium.on_raw_message_delete, FakeRawDelete(message))
+        if realtime:
+            await asyncio.sleep(1 / 50)
+
+async def flood(run, scale):
+    """Hundreds of fresh accounts post near-identical invites across channels."""
+    guild = FakeGuild("flood", members=2000)
+    run.bot._guilds[guild.id] = guild
+    run.enable_premium(guild, "content_flood")
+    channels = [guild.add_channel(f"chat-{i}") for i in range(10)]
+    people = list(guild._members.values())[2:]
+    raiders = guild.add_members(int(300 * scale) or 1)
+    rng = random.Random(23)
+    for i in range(int(3_000 * scale)):
+        if rng.random() < 0.5:
+            message = FakeMessage(rng.choice(raiders), rng.choice(channels),
+                                  f"JOIN NOW {rng.randint(1, 999)}!! https://discord.gg/raid{'!' * (i % 3)}")
+        else:
+            message = FakeMessage(rng.choice(people), rng.choice(channels), f"normal conversation message {i}")
+        await run.call(run.premium.on_message, message)
+
+async def links(run, scale):
+    """Chat with links checked against a 300k-domain phishing blocklist."""
+    rng = random.Random(24)
+    blocked = [f"{''.join(rng.choices('abcdefghijklmnopqrstuvwxyz', k=10))}.{rng.choice(['com', 'net', 'gift', 'ru'])}"
+               for _ in range(int(300_000 * scale) or 1)]
+    with open("link_blocklist.txt", "w") as f:
+        f.write("\n".join(blocked))
+    blocklist.path = "link_blocklist.txt"
+    await blocklist.reload()
+    guild = FakeGuild("links", members=2000)
+    run.bot._guilds[guild.id] = guild
+    run.enable_premium(guild, "links")
+    channels = [guild.add_channel(f"chat-{i}") for i in range(5)]
+    people = list(guild._members.values())[2:]
+    for i in range(int(10_000 * scale)):
+        roll = rng.random()
+        if roll < 0.05:
+            content = f"claim here https://login.{rng.choice(blocked)}/steam"
+        elif roll < 0.5:
+            content = f"look at https://www.youtube.com/watch?v={i} and https://github.com/x/y"
+        else:
+            content = f"plain message number {i}"
+        await run.call(run.premium.on_message, FakeMessage(rng.choice(people), rng.choice(channels), content))
+
+async def large_guild(run, scale):
+    """Routine traffic in a 1M-member guild with every protection on."""
+    guild = FakeGuild("large", members=int(1_000_000 * scale))
+    run.bot._guilds[guild.id] = guild
+    run.security.settings.set_mask(guild.id, run.security.settings.all)
+    run.enable_premium(guild, *PREMIUM_BITS)
+    channels = [guild.add_channel(f"chat-{i}") for i in range(50)]
+    members = list(guild._members.values())[2:]
+    rng = random.Random(1)
+    for i in range(int(20_000 * scale) or 1):
+        roll = rng.random()
+        if roll < 0.9:
+            message = FakeMessage(rng.choice(members), rng.choice(channels), f"hello {i}")
+            await run.call(run.premium.on_message, message)
+        else:
+            await run.call(run.security.on_member_join, guild.add_members(1)[0])
+            await asyncio.sleep(0)
+
+SCENARIOS = {
+    "raid": raid,
+    "nuke": nuke,
+    "spam": spam,
+    "flood": flood,
+    "links": links,
+    "large_guild": large_guild,
+}
+
+# ------------ RUNNER ------------
+def percentile(values, p):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+async def drain(bot):
+    # Let queued bans and batched log sends finish so they count toward the run
+    dispatcher = getattr(bot, "log_dispatcher", None)
+    if dispatcher is not None:
+        for key in list(dispatcher._batches):
+            dispatcher._flush_now(key)
+    for _ in range(100):
+        pending = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        if not pending:
+            break
+        await asyncio.wait(pending, timeout=1)
+
+async def run_scenario(name, scale, memory, realtime):
+    bot = FakeBot([])
+    run = Run(bot)
+    gc.collect()
+    if memory:
+        tracemalloc.start()
+    if name == "spam":
+        await spam(run, scale, realtime)
+    else:
+        await SCENARIOS[name](run, scale)
+    await drain(bot)
+    elapsed = time.perf_counter() - (run.started or time.perf_counter())
+    peak = tracemalloc.get_traced_memory()[1] if memory else None
+    if memory:
+        tracemalloc.stop()
+    return {
+        "scenario": name,
+        "events": len(run.latencies),
+        "seconds": round(elapsed, 3),
+        "events_per_s": round(len(run.latencies) / elapsed, 1) if elapsed else 0,
+        "p50_us": round(percentile(run.latencies, 50) * 1e6, 1),
+        "p99_us": round(percentile(run.latencies, 99) * 1e6, 1),
+        "mean_us": round(statistics.fmean(run.latencies) * 1e6, 1) if run.latencies else 0,
+        "peak_mib": round(peak / 2**20, 1) if peak is not None else None,
+    }
+
+def print_table(results):
+    header = f"{'scenario':<12} {'events':>8} {'seconds':>8} {'events/s':>10} {'p50 µs':>9} {'p99 µs':>9} {'peak MiB':>9}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        peak = "-" if r["peak_mib"] is None else r["peak_mib"]
+        print(f"{r['scenario']:<12} {r['events']:>8} {r['seconds']:>8} {r['events_per_s']:>10} {r['p50_us']:>9} {r['p99_us']:>9} {peak:>9}")
+
+def main():
+    global REST_LATENCY
+    parser = argparse.ArgumentParser(description="Replay synthetic attack traffic into the security cogs.")
+    parser.add_argument("scenarios", nargs="*", metavar="scenario",
+                        help=f"scenarios to run (default: all of {', '.join(SCENARIOS)})")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every scenario's size (e.g. 0.1 for a quick run)")
+    parser.add_argument("--rest-latency", type=float, default=0.0, help="milliseconds added to each stubbed REST call")
+    parser.add_argument("--realtime", action="store_true", help="pace the spam flood at 50 msg/s instead of replaying flat out")
+    parser.add_argument("--no-memory", action="store_true", help="skip tracemalloc (it slows the handlers down)")
+    parser.add_argument("--json", metavar="PATH", help="also write the results as JSON")
+    args = parser.parse_args()
+    REST_LATENCY = args.rest_latency / 1000
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(sorted(unknown))}")
+
+    results = []
+    for name in args.scenarios or SCENARIOS:
+        results.append(asyncio.run(run_scenario(name, args.scale, not args.no_memory, args.realtime)))
+    print_table(results)
+    if args.json:
+        with open(os.path.join(ROOT, args.json), "w") as f:
+            json.dump({"python": sys.version.split()[0], "scale": args.scale,
+                       "rest_latency_ms": args.rest_latency, "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
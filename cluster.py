@@ -0,0 +1,83 @@
+"""Run SecureAura as several worker processes sharing one SQLite store.
+
+Each worker runs main.py with its own range of shards, so guild events are
+spread over CLUSTERS processes (and CPU cores). State lives in the SQLite
+database and changes made by one worker reach the others through its
+change feed.
+
+    CLUSTERS=4 TOTAL_SHARDS=16 DISCORD_TOKEN=... python cluster.py
+"""
+import os
+import signal
+import subprocess
+import sys
+import time
+
+CLUSTERS = int(os.environ.get("CLUSTERS", os.cpu_count() or 1))
+TOTAL_SHARDS = int(os.environ.get("TOTAL_SHARDS", CLUSTERS))
+RESTART_DELAY = 5  # seconds before a crashed worker is started again
+
+def shard_ranges(total_shards, clusters):
+    """Split shard ids 0..total_shards-1 into ``clusters`` contiguous ranges."""
+    clusters = max(1, min(clusters, total_shards))
+    size, extra = divmod(total_shards, clusters)
+    ranges, start = [], 0
+    for i in range(clusters):
+        end = start + size + (1 if i < extra else 0)
+        ranges.append(list(range(start, end)))
+        start = end
+    return ranges
+
+def worker_env(cluster_id, shard_ids):
+    env = dict(os.environ)
+    env["SECUREAURA_STORAGE"] = "sqlite"
+    env["SHARD_COUNT"] = str(TOTAL_SHARDS)
+    env["SHARD_IDS"] = ",".join(str(i) for i in shard_ids)
+    env["CLUSTER_ID"] = str(cluster_id)
+    return env
+
+def start_worker(cluster_id, shard_ids):
+    print(f"Starting cluster {cluster_id} with shards {shard_ids[0]}-{shard_ids[-1]}")
+    main_py = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+    return subprocess.Popen([sys.executable, main_py], env=worker_env(cluster_id, shard_ids))
+
+def main():
+    if "DISCORD_TOKEN" not in os.environ:
+        sys.exit("DISCORD_TOKEN is not set")
+
+    # Create the schema and import the JSON files once, before workers race for it
+    os.environ["SECUREAURA_STORAGE"] = "sqlite"
+    from utils.storage import storage
+    storage.flush_sync()
+
+    ranges = shard_ranges(TOTAL_SHARDS, CLUSTERS)
+    workers = {i: start_worker(i, shard_ids) for i, shard_ids in enumerate(ranges)}
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for proc in workers.values():
+            if proc.poll() is None:
+                proc.terminate()
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    while not stopping:
+        time.sleep(1)
+        for i, proc in list(workers.items()):
+            code = proc.poll()
+            if code is not None and not stopping:
+                print(f"Cluster {i} exited with code {code}, restarting in {RESTART_DELAY}s")
+                time.sleep(RESTART_DELAY)
+                workers[i] = start_worker(i, ranges[i])
+
+    for proc in workers.values():
+        try:
+            proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+if __name__ == "__main__":
+    main()
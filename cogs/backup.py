@@ -0,0 +1,129 @@
+import discord
+from discord.ext import commands
+from discord import app_commands
+from datetime import datetime
+from utils.snapshots import SnapshotRecorder, SnapshotStore, diff_states
+from utils.profiling import profile_listeners
+
+def get_snapshots(bot):
+    """Return the bot-wide snapshot recorder, creating it on first use."""
+    recorder = getattr(bot, "snapshots", None)
+    if recorder is None:
+        recorder = bot.snapshots = SnapshotRecorder(SnapshotStore())
+    return recorder
+
+def _names(records, ids, prefix=""):
+    names = [f"{prefix}{records[i]['name']}" for i in ids if i in records]
+    text = ", ".join(names[:30]) + (f" (+{len(names) - 30} more)" if len(names) > 30 else "")
+    return text[:1024] or "none"
+
+@profile_listeners
+class Backup(commands.Cog):
+    backup_group = app_commands.Group(
+        name="backup", description="Server structure snapshots",
+        default_permissions=discord.Permissions(administrator=True), guild_only=True
+    )
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.snapshots = get_snapshots(bot)
+        self.snapshots.start()
+        # Reloading the extension on a running bot
+        for guild in bot.guilds:
+            if not self.snapshots.tracked(guild.id):
+                self.snapshots.queue_capture(guild)
+
+    async def cog_unload(self):
+        self.snapshots.stop()
+        await self.snapshots.flush()
+
+    # ------------ FULL CAPTURE ------------
+    @commands.Cog.listener()
+    async def on_guild_available(self, guild):
+        self.snapshots.queue_capture(guild)
+
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild):
+        self.snapshots.queue_capture(guild)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild):
+        self.snapshots.drop(guild.id)
+
+    # ------------ INCREMENTAL CHANGES ------------
+    @commands.Cog.listener()
+    async def on_guild_channel_create(self, channel):
+        self.snapshots.observe("channels", channel)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_update(self, before, after):
+        self.snapshots.observe("channels", after)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel):
+        self.snapshots.remove("channels", channel)
+
+    @commands.Cog.listener()
+    async def on_guild_role_create(self, role):
+        self.snapshots.observe("roles", role)
+
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before, after):
+        self.snapshots.observe("roles", after)
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role):
+        self.snapshots.remove("roles", role)
+
+    # ------------ COMMANDS ------------
+    @backup_group.command(name="list", description="Show the most recent snapshots of this server")
+    async def backup_list(self, interaction: discord.Interaction):
+        await interaction.response.defer(ephemeral=True)
+        await self.snapshots.flush([interaction.guild_id])
+        rows = await self.snapshots.store.history(interaction.guild_id)
+        if not rows:
+            await interaction.followup.send("No snapshots yet; the first one is taken shortly after the bot starts.", ephemeral=True)
+            return
+        lines = [
+            f"`#{snapshot_id}` {datetime.utcfromtimestamp(ts):%Y-%m-%d %H:%M} UTC · "
+            + (f"full ({changes} objects)" if full else f"{changes} change{'s' if changes != 1 else ''}")
+            for snapshot_id, ts, full, changes in rows
+        ]
+        embed = discord.Embed(title="Server Snapshots", description="\n".join(lines), color=discord.Color.blue())
+        embed.set_footer(text="Use /backup compare <id> to see what changed since a snapshot.")
+        await interaction.followup.send(embed=embed, ephemeral=True)
+
+    @backup_group.command(name="compare", description="Show roles and channels changed since a snapshot")
+    @app_commands.describe(snapshot_id="Snapshot id from /backup list")
+    async def backup_compare(self, interaction: discord.Interaction, snapshot_id: int):
+        await interaction.response.defer(ephemeral=True)
+        guild = interaction.guild
+        current = self.snapshots.state(guild.id)
+        then, _, found = await self.snapshots.store.state(guild.id, snapshot_id)
+        if then is None or current is None or found != snapshot_id:
+            await interaction.followup.send("That snapshot does not exist for this server.", ephemeral=True)
+            return
+        diff = diff_states(then, current)
+        changed = {kind: [i for i in ids if i in then[kind]] for kind, ids in diff["set"].items()}
+        added = {kind: [i for i in ids if i not in then[kind]] for kind, ids in diff["set"].items()}
+        deleted = diff["del"]
+        records = await self.snapshots.store.records(
+            then[kind][i] for part in (deleted, changed) for kind, ids in part.items() for i in ids
+        )
+        old = {kind: {} for kind in then}
+        for part in (deleted, changed):
+            for kind, ids in part.items():
+                old[kind].update((i, records[then[kind][i]]) for i in ids if then[kind][i] in records)
+        embed = discord.Embed(title=f"Changes Since Snapshot #{snapshot_id}", color=discord.Color.orange())
+        embed.add_field(name="Deleted roles", value=_names(old.get("roles", {}), deleted.get("roles", [])), inline=False)
+        embed.add_field(name="Deleted channels", value=_names(old.get("channels", {}), deleted.get("channels", []), "#"), inline=False)
+        embed.add_field(name="Changed", value=(
+            f"{len(changed.get('roles', []))} roles, {len(changed.get('channels', []))} channels"
+        ), inline=True)
+        embed.add_field(name="Added", value=(
+            f"{len(added.get('roles', []))} roles, {len(added.get('channels', []))} channels"
+        ), inline=True)
+        await interaction.followup.send(embed=embed, ephemeral=True)
+
+async def setup(bot):
+    await bot.add_cog(Backup(bot))
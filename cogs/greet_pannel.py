@@ -1,20 +1,33 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-import json
-import os
+import asyncio
+import copy
+import re
+from utils.storage import storage
+from utils.punish import get_punisher
+from utils.profiling import profile_listeners
 
-GREET_FILE = "greet_settings.json"
+GREET_BATCH_WINDOW = 3   # seconds during which further joins are folded into one greeting
+GREET_BATCH_SIZE = 20    # members mentioned per greeting message
+
+GREET_PLACEHOLDERS = {
+    "user": "Mention (display name in the embed title)",
+    "user.mention": "Mention",
+    "user.name": "Display name",
+    "user.id": "User ID",
+    "server": "Server name",
+    "member_count": "Member count",
+    "join_position": "Join position",
+}
+PLACEHOLDER_RE = re.compile(r"\{([a-z_.]+)\}")
 
 def load_greets():
-    if not os.path.exists(GREET_FILE):
-        return {}
-    with open(GREET_FILE, "r") as f:
-        return json.load(f)
+    return copy.deepcopy(storage.load("greets"))
 
-def save_greets(data):
-    with open(GREET_FILE, "w") as f:
-        json.dump(data, f, indent=2)
+def save_greets(data, guild_id=None):
+    rows = None if guild_id is None else {guild_id: data.get(str(guild_id))}
+    storage.save("greets", lambda: copy.deepcopy(data), rows, indent=2)
 
 def parse_color(text):
     text = text.strip().lower()
@@ -77,9 +90,94 @@ class GreetSetupView(discord.ui.View):
         self.value = "embed"
         self.stop()
 
+def template_errors(text):
+    """Return the unknown placeholders used in ``text``."""
+    return sorted({key for key in PLACEHOLDER_RE.findall(text or "") if key not in GREET_PLACEHOLDERS})
+
+def placeholder_help():
+    return "\n".join(f"`{{{key}}}` - {desc}" for key, desc in GREET_PLACEHOLDERS.items())
+
+class GreetTemplate:
+    """A greet string split once into literal text and placeholder keys.
+
+    ``segments`` alternates literal, key, literal, ... so rendering is a
+    single join. Unknown placeholders are kept as literal text.
+    """
+    __slots__ = ("segments",)
+
+    def __init__(self, text):
+        segments = [""]
+        pos = 0
+        for match in PLACEHOLDER_RE.finditer(text):
+            segments[-1] += text[pos:match.start()]
+            if match.group(1) in GREET_PLACEHOLDERS:
+                segments += [match.group(1), ""]
+            else:
+                segments[-1] += match.group(0)
+            pos = match.end()
+        segments[-1] += text[pos:]
+        self.segments = tuple(segments)
+
+    def render(self, values):
+        segments = self.segments
+        if len(segments) == 1:
+            return segments[0]
+        out = list(segments)
+        out[1::2] = [values[key] for key in segments[1::2]]
+        return "".join(out)
+
+class CompiledGreet:
+    __slots__ = ("type", "channel_id", "message", "title", "description", "footer", "image", "color")
+
+    def __init__(self, data):
+        self.type = data["type"]
+        self.channel_id = data.get("channel_id")
+        self.message = GreetTemplate(data.get("message") or "")
+        self.title = GreetTemplate(data.get("title") or "")
+        self.description = GreetTemplate(data.get("description") or "")
+        self.footer = GreetTemplate(data["footer"]) if data.get("footer") else None
+        self.image = data.get("image")
+        self.color = data.get("color", 0x3498db)
+
+def render_greet(greet, guild, members):
+    """Build send() kwargs greeting one or more members with a compiled greet."""
+    mentions = ", ".join(m.mention for m in members)
+    names = ", ".join(m.display_name for m in members)
+    # The newest joiners hold the last positions in the member count
+    count = guild.member_count or len(members)
+    first = count - len(members) + 1
+    values = {
+        "user": mentions,
+        "user.mention": mentions,
+        "user.name": names,
+        "user.id": ", ".join(str(m.id) for m in members),
+        "server": guild.name,
+        "member_count": str(count),
+        "join_position": str(count) if first >= count else f"{first}-{count}",
+    }
+    if greet.type == "normal":
+        return {"content": greet.message.render(values)}
+    embed = discord.Embed(
+        title=greet.title.render({**values, "user": names}),
+        description=greet.description.render(values),
+        color=greet.color
+    )
+    if greet.footer:
+        embed.set_footer(text=greet.footer.render(values))
+    if greet.image:
+        embed.set_image(url=greet.image)
+    return {"embed": embed}
+
+@profile_listeners
 class GreetCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.greets = load_greets()
+        self.compiled = {gid: CompiledGreet(data) for gid, data in self.greets.items()}
+        storage.subscribe("greets", self._apply_greet)
+        self._pending = {}   # guild_id: members waiting for the next batched greeting
+        self._windows = {}   # guild_id: TimerHandle closing the current batch window
+        self._greeting = set()   # strong refs so in-flight greetings are not garbage collected
 
     @app_commands.command(name="setup_greet", description="Set up the welcome/greet panel")
     async def setup_greet(self, interaction: discord.Interaction):
@@ -87,7 +185,6 @@ class GreetCog(commands.Cog):
             await interaction.response.send_message(embed=discord.Embed(description="You need Manage Server permission.", color=discord.Color.red()), ephemeral=True)
             return
 
-        greets = load_greets()
         guild_id = str(interaction.guild_id)
         view = GreetSetupView(self, interaction.user.id)
         embed = discord.Embed(
@@ -109,13 +206,15 @@ class GreetCog(commands.Cog):
         def check(m):
             return m.author.id == interaction.user.id and m.channel == interaction.channel
         # Step 1: Ask for message
-        embed = discord.Embed(title="Step 1: Welcome Message", description="Please type your welcome message (use `{user}` for mention):", color=discord.Color.blue())
+        embed = discord.Embed(title="Step 1: Welcome Message", description=f"Please type your welcome message. Placeholders:\n{placeholder_help()}", color=discord.Color.blue())
         await interaction.followup.send(embed=embed, ephemeral=True)
         try:
             msg_normal = await self.bot.wait_for('message', timeout=120, check=check)
         except:
             await interaction.followup.send(embed=discord.Embed(description="Setup timed out.", color=discord.Color.red()), ephemeral=True)
             return
+        if await self._reject_template(interaction, msg_normal.content):
+            return
         # Step 2: Ask for channel
         embed = discord.Embed(title="Step 2: Channel", description="Please mention the channel for welcome messages (e.g., #general):", color=discord.Color.blue())
         await interaction.followup.send(embed=embed, ephemeral=True)
@@ -125,26 +224,26 @@ class GreetCog(commands.Cog):
         except (IndexError, TimeoutError):
             await interaction.followup.send(embed=discord.Embed(description="Invalid or no channel provided. Setup cancelled.", color=discord.Color.red()), ephemeral=True)
             return
-        greets = load_greets()
-        greets[str(interaction.guild_id)] = {
+        self._set_greet(interaction.guild_id, {
             "type": "normal",
             "message": msg_normal.content,
             "channel_id": channel.id
-        }
-        save_greets(greets)
+        })
         await interaction.followup.send(embed=discord.Embed(description=f"Normal welcome message set in {channel.mention}!", color=discord.Color.green()), ephemeral=True)
 
     async def embed_flow(self, interaction):
         def check(m):
             return m.author.id == interaction.user.id and m.channel == interaction.channel
         # Step 1: Title
-        embed = discord.Embed(title="Step 1: Embed Title", description="Please type the EMBED TITLE:", color=discord.Color.blue())
+        embed = discord.Embed(title="Step 1: Embed Title", description=f"Please type the EMBED TITLE. Placeholders:\n{placeholder_help()}", color=discord.Color.blue())
         await interaction.followup.send(embed=embed, ephemeral=True)
         try:
             title_msg = await self.bot.wait_for('message', timeout=120, check=check)
         except:
             await interaction.followup.send(embed=discord.Embed(description="Setup timed out.", color=discord.Color.red()), ephemeral=True)
             return
+        if await self._reject_template(interaction, title_msg.content):
+            return
         # Step 2: Description
         embed = discord.Embed(title="Step 2: Embed Description", description="Please type the EMBED DESCRIPTION:", color=discord.Color.blue())
         await interaction.followup.send(embed=embed, ephemeral=True)
@@ -153,6 +252,8 @@ class GreetCog(commands.Cog):
         except:
             await interaction.followup.send(embed=discord.Embed(description="Setup timed out.", color=discord.Color.red()), ephemeral=True)
             return
+        if await self._reject_template(interaction, desc_msg.content):
+            return
         # Step 3: Footer
         embed = discord.Embed(title="Step 3: Embed Footer (Optional)", description="Please type the EMBED FOOTER (or type `skip`):", color=discord.Color.blue())
         await interaction.followup.send(embed=embed, ephemeral=True)
@@ -161,6 +262,8 @@ class GreetCog(commands.Cog):
             footer = None if footer_msg.content.lower() == 'skip' else footer_msg.content
         except:
             footer = None
+        if await self._reject_template(interaction, footer):
+            return
         # Step 4: Image
         embed = discord.Embed(title="Step 4: Embed Image (Optional)", description="Send an image URL for the bottom of the embed (or type `skip`):", color=discord.Color.blue())
         await interaction.followup.send(embed=embed, ephemeral=True)
@@ -188,8 +291,7 @@ class GreetCog(commands.Cog):
         except (IndexError, TimeoutError):
             await interaction.followup.send(embed=discord.Embed(description="Invalid or no channel provided. Setup cancelled.", color=discord.Color.red()), ephemeral=True)
             return
-        greets = load_greets()
-        greets[str(interaction.guild_id)] = {
+        self._set_greet(interaction.guild_id, {
             "type": "embed",
             "title": title_msg.content,
             "description": desc_msg.content,
@@ -197,10 +299,31 @@ class GreetCog(commands.Cog):
             "image": image,
             "color": color_value,
             "channel_id": channel.id
-        }
-        save_greets(greets)
+        })
         await interaction.followup.send(embed=discord.Embed(description=f"Embed welcome message set in {channel.mention}!", color=discord.Color.green()), ephemeral=True)
 
+    def _apply_greet(self, guild_id, data):
+        # Greet configured through another cluster process
+        if data is None:
+            self.greets.pop(str(guild_id), None)
+            self.compiled.pop(str(guild_id), None)
+        else:
+            self.greets[str(guild_id)] = data
+            self.compiled[str(guild_id)] = CompiledGreet(data)
+
+    def _set_greet(self, guild_id, data):
+        self.greets[str(guild_id)] = data
+        self.compiled[str(guild_id)] = CompiledGreet(data)
+        save_greets(self.greets, guild_id)
+
+    async def _reject_template(self, interaction, text):
+        unknown = template_errors(text)
+        if not unknown:
+            return False
+        names = ", ".join(f"`{{{key}}}`" for key in unknown)
+        await interaction.followup.send(embed=discord.Embed(description=f"Unknown placeholder(s): {names}. Setup cancelled.\n\n{placeholder_help()}", color=discord.Color.red()), ephemeral=True)
+        return True
+
     @app_commands.command(name="greettest", description="Test your current welcome/greet message")
     async def greettest_slash(self, interaction: discord.Interaction):
         await self.send_greet(interaction.guild, interaction.user, interaction.channel)
@@ -211,25 +334,58 @@ class GreetCog(commands.Cog):
         await self.send_greet(ctx.guild, ctx.author, ctx.channel)
 
     async def send_greet(self, guild, member, target_channel):
-        greets = load_greets()
-        data = greets.get(str(guild.id))
-        if not data:
+        greet = self.compiled.get(str(guild.id))
+        if not greet:
             await target_channel.send(embed=discord.Embed(description="No greet message is set up for this server.", color=discord.Color.orange()))
             return
-        if data["type"] == "normal":
-            msg = data["message"].replace("{user}", member.mention)
-            await target_channel.send(msg)
-        elif data["type"] == "embed":
-            embed = discord.Embed(
-                title=data["title"].replace("{user}", member.display_name),
-                description=data["description"].replace("{user}", member.mention),
-                color=data.get("color", 0x3498db)
-            )
-            if data.get("footer"):
-                embed.set_footer(text=data["footer"])
-            if data.get("image"):
-                embed.set_image(url=data["image"])
-            await target_channel.send(embed=embed)
+        await target_channel.send(**render_greet(greet, guild, [member]))
+
+    # ------------ JOIN GREETINGS ------------
+    @commands.Cog.listener()
+    async def on_member_join(self, member: discord.Member):
+        if member.bot or str(member.guild.id) not in self.compiled:
+            return
+        guild_id = member.guild.id
+        if guild_id in self._windows:
+            # Inside a join wave: fold this member into the next batched greeting
+            self._pending.setdefault(guild_id, []).append(member)
+            return
+        self._open_window(guild_id)
+        await self._greet(member.guild, [member])
+
+    def _open_window(self, guild_id):
+        self._windows[guild_id] = asyncio.get_running_loop().call_later(GREET_BATCH_WINDOW, self._close_window, guild_id)
+
+    def _close_window(self, guild_id):
+        self._windows.pop(guild_id, None)
+        members = self._pending.pop(guild_id, None)
+        if not members:
+            return
+        # Keep batching while the wave lasts
+        self._open_window(guild_id)
+        task = asyncio.ensure_future(self._greet(members[0].guild, members))
+        self._greeting.add(task)
+        task.add_done_callback(self._greeting.discard)
+
+    async def _greet(self, guild, members):
+        greet = self.compiled.get(str(guild.id))
+        channel = guild.get_channel(greet.channel_id) if greet else None
+        if channel is None:
+            return
+        punisher = get_punisher(self.bot)
+        for i in range(0, len(members), GREET_BATCH_SIZE):
+            try:
+                # Low priority: never competes with anti-raid bans for the guild
+                await punisher.submit(guild, "send", channel, **render_greet(greet, guild, members[i:i + GREET_BATCH_SIZE]))
+            except Exception:
+                pass
+
+    def cog_unload(self):
+        storage.unsubscribe("greets", self._apply_greet)
+        for timer in self._windows.values():
+            timer.cancel()
+        self._windows.clear()
+        self._pending.clear()
 
 async def setup(bot):
     await bot.add_cog(GreetCog(bot))
\ No newline at end of file
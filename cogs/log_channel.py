@@ -1,20 +1,16 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-import json
-import os
+from utils.storage import storage
+from utils.gateway import resolve_owner
+from utils.profiling import profile_listeners
 
-LOG_CHANNELS_FILE = "log_channels.json"
-
-def save_log_channels(log_channels):
-    with open(LOG_CHANNELS_FILE, "w") as f:
-        json.dump({str(k): v for k, v in log_channels.items()}, f)
+def save_log_channels(log_channels, guild_id=None):
+    rows = None if guild_id is None else {guild_id: log_channels.get(guild_id)}
+    storage.save("log_channels", lambda: {str(k): v for k, v in log_channels.items()}, rows)
 
 def load_log_channels():
-    if not os.path.exists(LOG_CHANNELS_FILE):
-        return {}
-    with open(LOG_CHANNELS_FILE, "r") as f:
-        return {int(k): v for k, v in json.load(f).items()}
+    return {int(k): v for k, v in storage.load("log_channels").items()}
 
 # Define the group ONCE at the module level
 logschannel_group = app_commands.Group(
@@ -28,7 +24,7 @@ logschannel_group = app_commands.Group(
 async def logschannel_create(interaction: discord.Interaction):
     guild = interaction.guild
     bot_member = guild.me
-    owner = guild.owner
+    owner = await resolve_owner(guild)
 
     log_channel = discord.utils.get(guild.text_channels, name="logs-secureaura")
     overwrites = {
@@ -48,13 +44,25 @@ async def logschannel_create(interaction: discord.Interaction):
     if not hasattr(interaction.client, "log_channels"):
         interaction.client.log_channels = load_log_channels()
     interaction.client.log_channels[guild.id] = log_channel.id
-    save_log_channels(interaction.client.log_channels)
+    save_log_channels(interaction.client.log_channels, guild.id)
 
+@profile_listeners
 class LogChannel(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         if not hasattr(bot, "log_channels"):
             bot.log_channels = load_log_channels()
+        storage.subscribe("log_channels", self._apply_log_channel)
+
+    def _apply_log_channel(self, guild_id, channel_id):
+        # Log channel set through another cluster process
+        if channel_id is None:
+            self.bot.log_channels.pop(int(guild_id), None)
+        else:
+            self.bot.log_channels[int(guild_id)] = channel_id
+
+    def cog_unload(self):
+        storage.unsubscribe("log_channels", self._apply_log_channel)
 
     # Optionally, block prefix command and respond with a hint
     @commands.command(name="logs")
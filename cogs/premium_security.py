@@ -1,11 +1,24 @@
 import discord
-from discord.ext import commands, tasks
+from discord.ext import commands
 from discord import app_commands
 from datetime import datetime, timedelta
-import json
-import os
+import asyncio
+import copy
+from utils.storage import storage
+from utils.spam import SpamWindow
+from utils.ghost_ping import GhostPingIndex
+from utils.flood import ContentFloodDetector, content_fingerprint
+from utils.links import blocklist, extract_hosts, match_domain, normalize_domain
+from utils.audit_cache import get_audit_cache
+from utils.sharding import ShardPartition, owns_guild
+from utils.gateway import resolve_member, resolve_owner
+from utils.punish import get_punisher
+from utils.log_dispatch import get_log_dispatcher
+from utils.log_channels import get_log_channels
+from utils.flags import bits_for, to_mask
+from utils.profiling import profile_listeners, phase
+from utils.expiry import ExpiryScheduler
 
-PREMIUM_FILE = "premium_servers.json"
 PREMIUM_JOIN_LINK = "https://discord.gg/ERYMCnhWjG"
 PREMIUM_ACTIVATION_CHANNEL_ID = 1388061112079224832  # Change if needed
 
@@ -18,7 +31,11 @@ PREMIUM_FEATURES = [
     ("invite_delete", "🇫"),
     ("ghost_ping", "🇬"),
     ("spam", "🇭"),
+    ("content_flood", "🇮"),
+    ("links", "🇯"),
 ]
+# Feature toggles are stored per guild as one int, one bit per feature
+PREMIUM_BITS = bits_for([key for key, _ in PREMIUM_FEATURES])
 PREMIUM_LABELS = {
     "server_rename": "Anti Server Rename",
     "server_icon": "Anti Server Icon Change",
@@ -27,34 +44,171 @@ PREMIUM_LABELS = {
     "emoji_delete": "Anti Emoji Delete",
     "invite_delete": "Anti Invite Delete",
     "ghost_ping": "Anti Ghost Ping",
-    "spam": "Anti Spam"
+    "spam": "Anti Spam",
+    "content_flood": "Anti Content Flood",
+    "links": "Anti Link"
 }
+# Default Anti Spam threshold: more than 5 messages within 3 seconds
+SPAM_MAX_MESSAGES = 5
+SPAM_INTERVAL = 3
+# Default Anti Content Flood threshold: one message from 6 people, or in 4 channels
+FLOOD_MAX_AUTHORS = 6
+FLOOD_MAX_CHANNELS = 4
+
+def _manages_messages(member):
+    # Moderators may repeat announcements and post any link
+    permissions = getattr(member, "guild_permissions", None)
+    return permissions is not None and permissions.manage_messages
 
 def load_premium():
-    if not os.path.exists(PREMIUM_FILE):
-        return {}
-    with open(PREMIUM_FILE, "r") as f:
-        return json.load(f)
+    return storage.load("premium")
+
+def save_premium(data, guild_ids=None):
+    rows = None if guild_ids is None else {gid: data.get(str(gid)) for gid in guild_ids}
+    storage.save("premium", lambda: copy.deepcopy(data), rows, indent=2, default=str)
+
+class PremiumRegistry:
+    """In-memory view of the premium table.
+
+    The table is read once; expiry datetimes are parsed up front so the
+    gateway listeners never touch the disk. Every mutation goes through
+    this class and is written back row by row with save_premium().
+    """
+
+    def __init__(self):
+        self._data = None
+        self._expires = {}
+        self._links = {}   # guild_id: (allowed domains, denied domains)
+
+    def _ensure_loaded(self):
+        if self._data is None:
+            self.reload()
+
+    def reload(self):
+        self._data = load_premium()
+        self._expires = {}
+        self._links = {}
+        for gid, info in self._data.items():
+            self._index(gid, info)
+
+    def _index(self, gid, info):
+        info["features"] = to_mask(info.get("features"), PREMIUM_BITS)
+        if info.get("link_allow") or info.get("link_deny"):
+            self._links[int(gid)] = (frozenset(info.get("link_allow", ())), frozenset(info.get("link_deny", ())))
+        else:
+            self._links.pop(int(gid), None)
+        try:
+            self._expires[int(gid)] = datetime.fromisoformat(info["expires_on"])
+        except Exception:
+            self._expires.pop(int(gid), None)
+
+    def save(self, guild_ids=None):
+        self._ensure_loaded()
+        save_premium(self._data, guild_ids)
+
+    def is_premium(self, guild_id):
+        self._ensure_loaded()
+        expires = self._expires.get(guild_id)
+        return expires is not None and datetime.utcnow() < expires
+
+    def get(self, guild_id):
+        self._ensure_loaded()
+        return self._data.get(str(guild_id))
+
+    def features(self, guild_id):
+        """Feature bitmask for an active premium guild, 0 otherwise."""
+        if not self.is_premium(guild_id):
+            return 0
+        entry = self._data.get(str(guild_id))
+        return entry["features"] if entry else 0
+
+    def activate(self, guild_id, entry):
+        self._ensure_loaded()
+        self._data[str(guild_id)] = entry
+        self._index(str(guild_id), entry)
+        self.save([guild_id])
+
+    def toggle(self, guild_id, feature_key):
+        self._ensure_loaded()
+        entry = self._data[str(guild_id)]
+        entry["features"] ^= PREMIUM_BITS[feature_key]
+        self.save([guild_id])
+        return entry["features"] & PREMIUM_BITS[feature_key] != 0
+
+    def apply(self, guild_id, entry):
+        """Apply a row written elsewhere (None when it was deleted) without saving."""
+        self._ensure_loaded()
+        if entry is None:
+            self._data.pop(str(guild_id), None)
+            self._expires.pop(int(guild_id), None)
+            self._links.pop(int(guild_id), None)
+        else:
+            self._data[str(guild_id)] = entry
+            self._index(str(guild_id), entry)
+
+    def spam_limit(self, guild_id):
+        entry = self.get(guild_id)
+        limit = entry.get("spam_limit") if entry else None
+        return tuple(limit) if limit else (SPAM_MAX_MESSAGES, SPAM_INTERVAL)
+
+    def set_spam_limit(self, guild_id, max_messages, interval):
+        self._ensure_loaded()
+        self._data[str(guild_id)]["spam_limit"] = [max_messages, interval]
+        self.save([guild_id])
+
+    def flood_limit(self, guild_id):
+        entry = self.get(guild_id)
+        limit = entry.get("flood_limit") if entry else None
+        return tuple(limit) if limit else (FLOOD_MAX_AUTHORS, FLOOD_MAX_CHANNELS)
+
+    def set_flood_limit(self, guild_id, max_authors, max_channels):
+        self._ensure_loaded()
+        self._data[str(guild_id)]["flood_limit"] = [max_authors, max_channels]
+        self.save([guild_id])
+
+    def link_rules(self, guild_id):
+        """(allowed, denied) domain sets for the guild's Anti Link feature."""
+        self._ensure_loaded()
+        return self._links.get(guild_id, (frozenset(), frozenset()))
+
+    def set_link_rule(self, guild_id, domain, rule):
+        """Put ``domain`` on the "allow" or "deny" list, or off both when ``rule`` is None."""
+        self._ensure_loaded()
+        entry = self._data[str(guild_id)]
+        for key in ("link_allow", "link_deny"):
+            domains = [d for d in entry.get(key, []) if d != domain]
+            if key == f"link_{rule}":
+                domains.append(domain)
+            entry[key] = domains
+        self._index(str(guild_id), entry)
+        self.save([guild_id])
 
-def save_premium(data):
-    with open(PREMIUM_FILE, "w") as f:
-        json.dump(data, f, indent=2, default=str)
+    def expires(self, guild_id):
+        self._ensure_loaded()
+        return self._expires.get(guild_id)
+
+    def expiries(self):
+        """(guild_id, expiry datetime) for every entry with a valid expiry."""
+        self._ensure_loaded()
+        return list(self._expires.items())
+
+    def remove(self, guild_ids):
+        self._ensure_loaded()
+        removed = []
+        for gid in guild_ids:
+            if self._data.pop(str(gid), None) is not None:
+                removed.append(gid)
+            self._expires.pop(int(gid), None)
+            self._links.pop(int(gid), None)
+        if removed:
+            self.save(removed)
+
+premium_registry = PremiumRegistry()
 
 def is_premium(guild_id):
-    data = load_premium()
-    entry = data.get(str(guild_id))
-    if not entry:
-        return False
-    try:
-        expires = datetime.fromisoformat(entry["expires_on"])
-    except Exception:
-        return False
-    return datetime.utcnow() < expires
+    return premium_registry.is_premium(guild_id)
 
-async def get_or_create_premium_log_channel(guild):
-    channel = discord.utils.get(guild.text_channels, name="premium-logs")
-    if channel:
-        return channel
+async def _create_premium_log_channel(guild):
     try:
         overwrites = {
             guild.default_role: discord.PermissionOverwrite(read_messages=False),
@@ -68,22 +222,24 @@ async def get_or_create_premium_log_channel(guild):
                 return c
         return None
 
+async def get_or_create_premium_log_channel(bot, guild):
+    return await get_log_channels(bot).get_or_create(guild, "premium-logs", _create_premium_log_channel)
+
 class PremiumPanelView(discord.ui.View):
     def __init__(self, cog, guild_id, timeout=30):
         super().__init__(timeout=timeout)
         self.cog = cog
         self.guild_id = guild_id
-        self.premium_data = load_premium()
         self.msg = None
         self.update_buttons()
 
     def update_buttons(self):
         self.clear_items()
-        features = self.premium_data[str(self.guild_id)]["features"]
+        features = premium_registry.get(self.guild_id)["features"]
         for key, emoji in PREMIUM_FEATURES:
             btn = discord.ui.Button(
                 label=emoji,
-                style=discord.ButtonStyle.success if features[key] else discord.ButtonStyle.secondary,
+                style=discord.ButtonStyle.success if features & PREMIUM_BITS[key] else discord.ButtonStyle.secondary,
                 custom_id=f"premium_toggle_{key}"
             )
             btn.callback = self.make_toggle_callback(key)
@@ -97,10 +253,8 @@ class PremiumPanelView(discord.ui.View):
                     "You must be an Administrator of this server to use the premium settings.", ephemeral=True
                 )
                 return
-            self.premium_data = load_premium()
-            features = self.premium_data[str(self.guild_id)]["features"]
-            features[feature_key] = not features[feature_key]
-            save_premium(self.premium_data)
+            premium_registry.toggle(self.guild_id, feature_key)
+            self.update_buttons()
             await interaction.response.edit_message(embed=self.cog.premium_panel_embed(self.guild_id), view=self)
         return callback
 
@@ -110,18 +264,50 @@ class PremiumPanelView(discord.ui.View):
                 btn.disabled = True
             await self.msg.edit(view=self)
 
+@profile_listeners
 class PremiumSecurity(commands.Cog):
+    antilink_group = app_commands.Group(name="antilink", description="Manage Anti Link allowed and blocked domains")
+
     def __init__(self, bot):
         self.bot = bot
-        self.check_premium_expiry.start()
-        self.bot.last_ghost_ping = {}
+        # Fires exactly when each guild's premium lapses
+        self.expiry = ExpiryScheduler(self._expire_premium)
+        self.expiry.rebuild(premium_registry.expiries())
+        if bot.is_ready():
+            self.expiry.start()
+        self.ghost_pings = ShardPartition(bot, lambda: GhostPingIndex(window=30))
+        self.audit_cache = get_audit_cache(bot)
+        self.punisher = get_punisher(bot)
+        self.log_dispatcher = get_log_dispatcher(bot)
+        self.spam_window = ShardPartition(bot, lambda: SpamWindow(SPAM_MAX_MESSAGES, SPAM_INTERVAL))
+        # Same message from many accounts or across many channels
+        self.content_flood = ShardPartition(bot, lambda: ContentFloodDetector(FLOOD_MAX_AUTHORS, FLOOD_MAX_CHANNELS))
+        # Activations and toggles made by other cluster processes
+        storage.subscribe("premium", self._apply_premium)
+        # Shared phishing blocklist, parsed off the event loop
+        self.blocklist_load = asyncio.create_task(blocklist.reload())
+
+    def cog_unload(self):
+        self.expiry.stop()
+        self.blocklist_load.cancel()
+        storage.unsubscribe("premium", self._apply_premium)
+
+    def _apply_premium(self, guild_id, entry):
+        premium_registry.apply(guild_id, entry)
+        self._schedule_expiry(int(guild_id))
+
+    def _schedule_expiry(self, guild_id):
+        expires = premium_registry.expires(guild_id)
+        if expires is None:
+            self.expiry.cancel(guild_id)
+        else:
+            self.expiry.schedule(guild_id, expires)
 
     def premium_panel_embed(self, guild_id):
-        data = load_premium()
-        features = data[str(guild_id)]["features"]
+        features = premium_registry.get(guild_id)["features"]
         lines = []
         for key, emoji in PREMIUM_FEATURES:
-            state = "on☑️" if features[key] else "off❎"
+            state = "on☑️" if features & PREMIUM_BITS[key] else "off❎"
             label = PREMIUM_LABELS[key]
             lines.append(f"{emoji} {label}:\n- {state}")
         embed = discord.Embed(
@@ -158,10 +344,95 @@ class PremiumSecurity(commands.Cog):
         sent_msg = await interaction.original_response()
         view.msg = sent_msg
 
+    @app_commands.command(name="antispamlimit", description="Set the Anti Spam threshold (messages per seconds)")
+    @app_commands.describe(messages="Messages allowed inside the window", seconds="Window length in seconds")
+    async def antispamlimit(self, interaction: discord.Interaction, messages: app_commands.Range[int, 2, 50], seconds: app_commands.Range[int, 1, 60]):
+        guild_id = interaction.guild_id
+        if not await self._check_premium_admin(interaction):
+            return
+        premium_registry.set_spam_limit(guild_id, messages, seconds)
+        self.spam_window.get(guild_id).forget(guild_id)
+        await interaction.response.send_message(f"Anti Spam will trigger above {messages} messages in {seconds}s.", ephemeral=True)
+
+    @app_commands.command(name="antifloodlimit", description="Set the Anti Content Flood threshold")
+    @app_commands.describe(authors="Members posting the same message", channels="Channels the same message appears in")
+    async def antifloodlimit(self, interaction: discord.Interaction, authors: app_commands.Range[int, 3, 50], channels: app_commands.Range[int, 2, 50]):
+        guild_id = interaction.guild_id
+        if not await self._check_premium_admin(interaction):
+            return
+        premium_registry.set_flood_limit(guild_id, authors, channels)
+        self.content_flood.get(guild_id).forget(guild_id)
+        await interaction.response.send_message(
+            f"Anti Content Flood will trigger when {authors} members post the same message, or it appears in {channels} channels.",
+            ephemeral=True
+        )
+
+    async def _check_premium_admin(self, interaction):
+        if not is_premium(interaction.guild_id):
+            await interaction.response.send_message("This feature is only available to premium servers.", ephemeral=True)
+            return False
+        if not interaction.user.guild_permissions.administrator:
+            await interaction.response.send_message(
+                "You must be an Administrator of this server to use the premium settings.",
+                ephemeral=True
+            )
+            return False
+        return True
+
+    async def _set_link_rule(self, interaction, domain, rule):
+        if not await self._check_premium_admin(interaction):
+            return
+        normalized = normalize_domain(domain)
+        if normalized is None or (normalized == "*" and rule != "deny"):
+            await interaction.response.send_message(f"`{domain}` is not a valid domain.", ephemeral=True)
+            return
+        premium_registry.set_link_rule(interaction.guild_id, normalized, rule)
+        messages = {
+            "allow": f"Links to `{normalized}` are now always allowed.",
+            "deny": "Every link not on the allow list will now be blocked." if normalized == "*" else f"Links to `{normalized}` will now be blocked.",
+            None: f"`{normalized}` removed from the Anti Link lists.",
+        }
+        await interaction.response.send_message(messages[rule], ephemeral=True)
+
+    @antilink_group.command(name="allow", description="Always allow links to a domain and its subdomains")
+    @app_commands.describe(domain="Domain such as example.com")
+    async def antilink_allow(self, interaction: discord.Interaction, domain: str):
+        await self._set_link_rule(interaction, domain, "allow")
+
+    @antilink_group.command(name="deny", description="Block links to a domain and its subdomains (* blocks every link)")
+    @app_commands.describe(domain="Domain such as example.com, or * for all links")
+    async def antilink_deny(self, interaction: discord.Interaction, domain: str):
+        await self._set_link_rule(interaction, domain, "deny")
+
+    @antilink_group.command(name="remove", description="Remove a domain from the allow and deny lists")
+    @app_commands.describe(domain="Domain to remove")
+    async def antilink_remove(self, interaction: discord.Interaction, domain: str):
+        await self._set_link_rule(interaction, domain, None)
+
+    @antilink_group.command(name="list", description="Show the allowed and blocked domains")
+    async def antilink_list(self, interaction: discord.Interaction):
+        if not await self._check_premium_admin(interaction):
+            return
+        allow, deny = premium_registry.link_rules(interaction.guild_id)
+        embed = discord.Embed(title="Anti Link Lists", color=discord.Color.purple())
+        embed.add_field(name="Allowed", value="\n".join(sorted(allow))[:1024] or "none", inline=True)
+        embed.add_field(name="Blocked", value="\n".join(sorted(deny))[:1024] or "none", inline=True)
+        embed.set_footer(text=f"Plus {len(blocklist)} known phishing domains")
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @commands.command()
+    @commands.is_owner()
+    async def reloadlinks(self, ctx):
+        try:
+            count = await blocklist.reload()
+        except Exception as e:
+            await ctx.send(f"Error: {e}")
+            return
+        await ctx.send(f"Link blocklist reloaded: {count} domains from `{blocklist.path}`.")
+
     @commands.command()
     @commands.is_owner()
     async def activatepremium(self, ctx, guild_id: int, duration: str, activated_by: discord.User):
-        data = load_premium()
         now = datetime.utcnow()
         duration = duration.strip().lower()
         if duration.endswith("d"):
@@ -172,16 +443,21 @@ class PremiumSecurity(commands.Cog):
             await ctx.send("Invalid duration. Use '30d' or '2m' etc.")
             return
         server = self.bot.get_guild(guild_id)
-        data[str(guild_id)] = {
+        entry = {
             "activated_by": activated_by.id,
             "activated_on": now.isoformat(),
             "duration": duration,
             "expires_on": expires.isoformat(),
-            "features": {k: False for k, _ in PREMIUM_FEATURES}
+            "features": 0
         }
         try:
-            save_premium(data)
-            await ctx.send(f"Premium activated for {server.name if server else guild_id}, expires on {expires.strftime('%Y-%m-%d')}")
+            premium_registry.activate(guild_id, entry)
+            self._schedule_expiry(guild_id)
+            reply = f"Premium activated for {server.name if server else guild_id}, expires on {expires.strftime('%Y-%m-%d')}"
+            if not server:
+                # Guilds on another cluster's shards are not in this process's cache
+                reply += ". No premium-logs notice was sent: that server is not visible from this cluster."
+            await ctx.send(reply)
         except Exception as e:
             await ctx.send(f"Error: {e}")
 
@@ -198,13 +474,15 @@ class PremiumSecurity(commands.Cog):
                         f"- Anti Emoji Delete\n"
                         f"- Anti Invite Delete\n"
                         f"- Anti Ghost Ping\n"
-                        f"- Anti Spam**\n"
+                        f"- Anti Spam\n"
+                        f"- Anti Content Flood\n"
+                        f"- Anti Link**\n"
                         f"**Note:**\nUse (`/antipremium`) to setup premium features.",
             color=discord.Color.gold()
         )
 
         if server:
-            log_channel = await get_or_create_premium_log_channel(server)
+            log_channel = await get_or_create_premium_log_channel(self.bot, server)
             if log_channel:
                 await log_channel.send(embed=embed)
             channel = self.bot.get_channel(PREMIUM_ACTIVATION_CHANNEL_ID)
@@ -213,123 +491,172 @@ class PremiumSecurity(commands.Cog):
                     f"Premium activated for `{server.name if server else guild_id}` by {activated_by.mention}, duration: {duration}"
                 )
 
-    @tasks.loop(hours=12)
-    async def check_premium_expiry(self):
-        data = load_premium()
-        now = datetime.utcnow()
-        expired = []
-        for gid, info in list(data.items()):
-            try:
-                if datetime.fromisoformat(info["expires_on"]) < now:
-                    expired.append(gid)
-            except Exception:
-                continue
-        for gid in expired:
-            guild = self.bot.get_guild(int(gid))
-            if guild:
-                embed = discord.Embed(
-                    title="Premium Expired",
-                    description="Premium has expired for this server. Please re-activate to continue using premium features.",
-                    color=discord.Color.red()
-                )
-                log_channel = await get_or_create_premium_log_channel(guild)
-                if log_channel:
-                    await log_channel.send(embed=embed)
-            data.pop(gid)
-        if expired:
-            save_premium(data)
+    async def _expire_premium(self, gid):
+        # In a cluster each process expires only the guilds on its own shards
+        if not owns_guild(self.bot, gid) or premium_registry.is_premium(gid):
+            return
+        guild = self.bot.get_guild(gid)
+        if guild:
+            embed = discord.Embed(
+                title="Premium Expired",
+                description="Premium has expired for this server. Please re-activate to continue using premium features.",
+                color=discord.Color.red()
+            )
+            log_channel = await get_or_create_premium_log_channel(self.bot, guild)
+            if log_channel:
+                await log_channel.send(embed=embed)
+        premium_registry.remove([gid])
+        self.spam_window.get(gid).forget(gid)
+        self.content_flood.get(gid).forget(gid)
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        # Expiry notices need the guild cache, so the scheduler starts once connected
+        self.expiry.start()
 
     @commands.Cog.listener()
     async def on_guild_update(self, before, after):
-        if not is_premium(after.id): return
-        entry = load_premium().get(str(after.id))
-        if not entry: return
-        data = entry["features"]
-        if data["server_rename"] and before.name != after.name:
-            await self._punish_premium_action(after, "Server Rename", action="kick")
-        if data["server_icon"] and before.icon != after.icon:
-            await self._punish_premium_action(after, "Server Icon Change", action="kick")
+        since = discord.utils.utcnow()
+        flags = premium_registry.features(after.id)
+        if not flags: return
+        if flags & PREMIUM_BITS["server_rename"] and before.name != after.name:
+            await self._punish_premium_action(after, "Server Rename", action="kick", audit_action=discord.AuditLogAction.guild_update, target_id=after.id, since=since)
+        if flags & PREMIUM_BITS["server_icon"] and before.icon != after.icon:
+            await self._punish_premium_action(after, "Server Icon Change", action="kick", audit_action=discord.AuditLogAction.guild_update, target_id=after.id, since=since)
 
     @commands.Cog.listener()
     async def on_guild_channel_update(self, before, after):
-        if not is_premium(after.guild.id): return
-        entry = load_premium().get(str(after.guild.id))
-        if not entry: return
-        data = entry["features"]
-        if data["channel_rename"] and before.name != after.name:
-            await self._punish_premium_action(after.guild, "Channel Rename", timeout_minutes=30, log=True)
+        since = discord.utils.utcnow()
+        flags = premium_registry.features(after.guild.id)
+        if not flags: return
+        if flags & PREMIUM_BITS["channel_rename"] and before.name != after.name:
+            await self._punish_premium_action(after.guild, "Channel Rename", timeout_minutes=30, log=True, audit_action=discord.AuditLogAction.channel_update, target_id=after.id, since=since)
 
     @commands.Cog.listener()
     async def on_guild_role_update(self, before, after):
-        if not is_premium(after.guild.id): return
-        entry = load_premium().get(str(after.guild.id))
-        if not entry: return
-        data = entry["features"]
-        if data["role_rename"] and before.name != after.name:
-            await self._punish_premium_action(after.guild, "Role Rename", timeout_minutes=30, log=True)
+        since = discord.utils.utcnow()
+        flags = premium_registry.features(after.guild.id)
+        if not flags: return
+        if flags & PREMIUM_BITS["role_rename"] and before.name != after.name:
+            await self._punish_premium_action(after.guild, "Role Rename", timeout_minutes=30, log=True, audit_action=discord.AuditLogAction.role_update, target_id=after.id, since=since)
 
     @commands.Cog.listener()
     async def on_guild_emojis_update(self, guild, before, after):
-        if not is_premium(guild.id): return
-        entry = load_premium().get(str(guild.id))
-        if not entry: return
-        data = entry["features"]
-        if data["emoji_delete"] and len(after) < len(before):
-            await self._punish_premium_action(guild, "Emoji Delete", timeout_minutes=60, log=True)
+        since = discord.utils.utcnow()
+        flags = premium_registry.features(guild.id)
+        if not flags: return
+        if flags & PREMIUM_BITS["emoji_delete"] and len(after) < len(before):
+            remaining = {e.id for e in after}
+            deleted = next((e.id for e in before if e.id not in remaining), None)
+            await self._punish_premium_action(guild, "Emoji Delete", timeout_minutes=60, log=True, audit_action=discord.AuditLogAction.emoji_delete, target_id=deleted, since=since)
 
     @commands.Cog.listener()
     async def on_guild_invites_update(self, guild, before, after):
-        if not is_premium(guild.id): return
-        entry = load_premium().get(str(guild.id))
-        if not entry: return
-        data = entry["features"]
-        if data["invite_delete"] and len(after) < len(before):
-            await self._punish_premium_action(guild, "Invite Delete", timeout_minutes=24*60, log=True)
+        since = discord.utils.utcnow()
+        flags = premium_registry.features(guild.id)
+        if not flags: return
+        if flags & PREMIUM_BITS["invite_delete"] and len(after) < len(before):
+            await self._punish_premium_action(guild, "Invite Delete", timeout_minutes=24*60, log=True, audit_action=discord.AuditLogAction.invite_delete, since=since)
 
     @commands.Cog.listener()
     async def on_message(self, message):
-        if not message.guild or not is_premium(message.guild.id): return
-        entry = load_premium().get(str(message.guild.id))
-        if not entry: return
-        data = entry["features"]
-        if data["ghost_ping"] and message.mentions:
-            self.bot.last_ghost_ping[message.id] = (message.author.id, datetime.utcnow(), message.channel.id)
-        if data["spam"]:
-            if not hasattr(self.bot, "msg_times"):
-                self.bot.msg_times = {}
-            user_times = self.bot.msg_times.setdefault(message.author.id, [])
-            now = datetime.utcnow()
-            user_times = [t for t in user_times if (now - t).total_seconds() < 3]
-            user_times.append(now)
-            self.bot.msg_times[message.author.id] = user_times
-            if len(user_times) > 5:
+        if not message.guild: return
+        flags = premium_registry.features(message.guild.id)
+        if not flags: return
+        if flags & PREMIUM_BITS["ghost_ping"] and message.mentions:
+            self.ghost_pings.get(message.guild.id).track(message.id, message.author.id, message.channel.id)
+        if flags & PREMIUM_BITS["spam"]:
+            with phase("decision"):
+                max_messages, interval = premium_registry.spam_limit(message.guild.id)
+                spamming = self.spam_window.get(message.guild.id).hit(message.guild.id, message.author.id, max_messages, interval)
+            if spamming:
                 await self._punish_premium_action(message.guild, "Spam", user_id=message.author.id, action="kick")
+        if flags & PREMIUM_BITS["content_flood"] and not message.author.bot and not _manages_messages(message.author):
+            with phase("decision"):
+                fingerprint = content_fingerprint(message)
+                max_authors, max_channels = premium_registry.flood_limit(message.guild.id)
+                flooders = () if fingerprint is None else self.content_flood.get(message.guild.id).hit(
+                    message.guild.id, fingerprint, message.author.id, message.channel.id, max_authors, max_channels)
+            for user_id in flooders:
+                await self._punish_premium_action(message.guild, "Content Flood", user_id=user_id, timeout_minutes=60, log=True)
+        if flags & PREMIUM_BITS["links"] and message.author != message.guild.me:
+            with phase("decision"):
+                host = self._blocked_link(message)
+            if host:
+                await self._block_link(message, host)
+
+    def _blocked_link(self, message):
+        """Host of the first link the guild's rules or the blocklist forbid, else None."""
+        hosts = extract_hosts(message.content)
+        if not hosts or _manages_messages(message.author):
+            return None
+        allow, deny = premium_registry.link_rules(message.guild.id)
+        for host in hosts:
+            if match_domain(host, allow):
+                continue
+            if match_domain(host, deny) or blocklist.match(host):
+                return host
+        return None
+
+    async def _block_link(self, message, host):
+        guild = message.guild
+        deleted = True
+        try:
+            with phase("punish"):
+                await self.punisher.submit(guild, "delete", message)
+        except Exception:
+            deleted = False
+        embed = discord.Embed(
+            title="Premium Security Triggered",
+            description=(f"{message.author.mention} posted a blocked link (`{host}`) in {message.channel.mention}"
+                         + (" and the message was deleted." if deleted else " (could not delete the message).")),
+            color=discord.Color.orange()
+        )
+        with phase("log"):
+            log_channel = await get_or_create_premium_log_channel(self.bot, guild)
+            if log_channel:
+                self.log_dispatcher.post(guild, log_channel, embed, fallback=await resolve_owner(guild))
 
     @commands.Cog.listener()
-    async def on_message_delete(self, message):
-        if not message.guild or not is_premium(message.guild.id): return
-        entry = load_premium().get(str(message.guild.id))
+    async def on_raw_message_delete(self, payload):
+        # Raw events fire even when the message has left the library's cache
+        if not payload.guild_id: return
+        entry = self.ghost_pings.get(payload.guild_id).pop(payload.message_id)
         if not entry: return
-        data = entry["features"]
-        if data["ghost_ping"]:
-            ghost_data = self.bot.last_ghost_ping.get(message.id)
-            if ghost_data:
-                user_id, sent_time, channel_id = ghost_data
-                if (datetime.utcnow() - sent_time).total_seconds() < 30:
-                    await self._punish_premium_action(message.guild, "Ghost Ping", user_id=user_id, timeout_minutes=60, log=True)
-                del self.bot.last_ghost_ping[message.id]
-
-    async def _punish_premium_action(self, guild, action_name, user_id=None, timeout_minutes=None, log=False, action=None):
+        flags = premium_registry.features(payload.guild_id)
+        if not flags & PREMIUM_BITS["ghost_ping"]: return
+        guild = self.bot.get_guild(payload.guild_id)
+        if guild:
+            await self._punish_premium_action(guild, "Ghost Ping", user_id=entry.author_id, timeout_minutes=60, log=True)
+
+    @commands.Cog.listener()
+    async def on_raw_bulk_message_delete(self, payload):
+        if not payload.guild_id: return
+        ghost_pings = self.ghost_pings.get(payload.guild_id)
+        authors = set()
+        for message_id in payload.message_ids:
+            entry = ghost_pings.pop(message_id)
+            if entry:
+                authors.add(entry.author_id)
+        if not authors: return
+        flags = premium_registry.features(payload.guild_id)
+        if not flags & PREMIUM_BITS["ghost_ping"]: return
+        guild = self.bot.get_guild(payload.guild_id)
+        if not guild: return
+        for user_id in authors:
+            await self._punish_premium_action(guild, "Ghost Ping", user_id=user_id, timeout_minutes=60, log=True)
+
+    async def _punish_premium_action(self, guild, action_name, user_id=None, timeout_minutes=None, log=False, action=None,
+                                     audit_action=None, target_id=None, since=None):
         member = None
         try:
-            if user_id:
-                member = guild.get_member(user_id)
-            else:
-                entry = None
-                async for entry in guild.audit_logs(limit=3):
-                    if entry.user and entry.user != guild.me:
-                        member = entry.user
-                        break
+            with phase("actor"):
+                if user_id:
+                    member = await resolve_member(guild, user_id)
+                elif audit_action is not None:
+                    entry = await self.audit_cache.resolve(guild, audit_action, target_id, since)
+                    if entry and entry.user and entry.user != guild.me:
+                        member = await resolve_member(guild, entry.user.id) or entry.user
         except Exception:
             pass
 
@@ -339,15 +666,15 @@ class PremiumSecurity(commands.Cog):
 
         if member and member != guild.me:
             try:
-                if timeout_minutes:
-                    until = discord.utils.utcnow() + timedelta(minutes=timeout_minutes)
-                    await member.timeout(until, reason=f"Premium Security: {action_name}")
-                    timedout = True
-                    punishment = f"timed out for {timeout_minutes} minutes"
-                elif action == "kick":
-                    await guild.kick(member, reason=f"Premium Security: {action_name}")
-                    kicked = True
-                    punishment = "kicked"
+                with phase("punish"):
+                    if timeout_minutes:
+                        await self.punisher.timeout(guild, member, timeout_minutes, reason=f"Premium Security: {action_name}")
+                        timedout = True
+                        punishment = f"timed out for {timeout_minutes} minutes"
+                    elif action == "kick":
+                        await self.punisher.kick(guild, member, reason=f"Premium Security: {action_name}")
+                        kicked = True
+                        punishment = "kicked"
             except discord.Forbidden:
                 punishment = "could not punish (missing permissions)"
             except Exception:
@@ -368,9 +695,10 @@ class PremiumSecurity(commands.Cog):
             description=desc,
             color=discord.Color.red() if (kicked or timedout) else discord.Color.orange()
         )
-        log_channel = await get_or_create_premium_log_channel(guild)
-        if log_channel:
-            await log_channel.send(embed=embed)
+        with phase("log"):
+            log_channel = await get_or_create_premium_log_channel(self.bot, guild)
+            if log_channel:
+                self.log_dispatcher.post(guild, log_channel, embed, fallback=await resolve_owner(guild))
 
 async def setup(bot):
     await bot.add_cog(PremiumSecurity(bot))
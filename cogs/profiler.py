@@ -0,0 +1,38 @@
+import discord
+from discord.ext import commands
+from utils.profiling import profiler
+
+MAX_CAPTURE_SECONDS = 600
+
+class Profiler(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+
+    @commands.command(name="profile")
+    @commands.is_owner()
+    async def profile(self, ctx, mode: str = None, seconds: int = 30):
+        """?profile cpu|memory [seconds] captures a profile; ?profile alone lists slow listeners."""
+        if mode is None:
+            embed = discord.Embed(title="Slow Listeners", color=discord.Color.blue())
+            recent = [f"`{when:%H:%M:%S}` {text}" for when, text in list(profiler.slow)[-15:]]
+            embed.description = "\n".join(recent) or f"None above {profiler.threshold * 1000:.0f} ms."
+            await ctx.send(embed=embed)
+            return
+        mode = mode.lower()
+        if mode not in ("cpu", "memory"):
+            await ctx.send("Usage: `?profile [cpu|memory] [seconds]`")
+            return
+        if profiler.capturing:
+            await ctx.send(f"A {profiler.capturing} capture is already running.")
+            return
+        seconds = max(1, min(seconds, MAX_CAPTURE_SECONDS))
+        await ctx.send(f"Capturing {mode} profile for {seconds}s...")
+        try:
+            path = await profiler.capture(mode, seconds)
+        except Exception as e:
+            await ctx.send(f"Profile capture failed: {e}")
+            return
+        await ctx.send(f"Profile written to `{path}`.")
+
+async def setup(bot):
+    await bot.add_cog(Profiler(bot))
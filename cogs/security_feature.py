@@ -1,30 +1,66 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-from collections import defaultdict
+from collections import defaultdict, deque
 from datetime import datetime
 import random
-import json
-import os
+import time
+import asyncio
+from utils.audit_cache import get_audit_cache
+from utils.punish import get_punisher
+from utils.log_dispatch import get_log_dispatcher
+from utils.log_channels import get_log_channels
+from utils.nuke import NukeDetector, DEFAULT_NUKE_LIMITS
+from utils.sharding import ShardPartition
+from utils.gateway import resolve_member, resolve_owner
+from utils.storage import storage
+from utils.flags import GuildFlags
+from utils.profiling import profile_listeners, phase
 
 SUPPORT_LINK = "https://discord.gg/ERYMCnhWjG"
-WHITELIST_FILE = "whitelists.json"
+BULK_BAN_CHUNK = 200  # Discord's limit for a single bulk ban request
+RECENT_JOINS_CAP = 10_000
+
+ANTI_FEATURES = ["antinuke", "antibotadd", "antiraid"]
+ANTINUKE, ANTIBOTADD, ANTIRAID = 1, 2, 4
+
+# Destructive actions seen only through the audit log: (detector action, description)
+AUDIT_NUKE_ACTIONS = {
+    discord.AuditLogAction.ban: ("ban", "ban a member"),
+    discord.AuditLogAction.kick: ("kick", "kick a member"),
+    discord.AuditLogAction.webhook_create: ("webhook", "create a webhook"),
+    discord.AuditLogAction.webhook_delete: ("webhook", "delete a webhook"),
+    discord.AuditLogAction.emoji_delete: ("emoji", "delete an emoji"),
+}
 
 def get_status_emoji(val):
     return '☑️' if val else '❎'
 
-def save_whitelists(whitelists):
-    data = {str(gid): list(uids) for gid, uids in whitelists.items()}
-    with open(WHITELIST_FILE, "w") as f:
-        json.dump(data, f)
+def save_whitelists(whitelists, guild_id=None):
+    rows = None if guild_id is None else {guild_id: list(whitelists[guild_id])}
+    storage.save("whitelists", lambda: {str(gid): list(uids) for gid, uids in whitelists.items()}, rows)
+
+def save_settings(settings, guild_id):
+    storage.save("settings", settings.dump, {guild_id: settings.stored(guild_id)})
+
+def load_settings():
+    settings = GuildFlags(ANTI_FEATURES)
+    settings.load(storage.load("settings"))
+    return settings
+
+def save_nuke_limits(detector, guild_id):
+    storage.save("nuke_limits", detector.dump_all_limits, {guild_id: detector.dump_limits(guild_id)})
+
+def load_nuke_limits():
+    detector = NukeDetector()
+    detector.load_limits(storage.load("nuke_limits"))
+    return detector
 
 def load_whitelists():
-    if not os.path.exists(WHITELIST_FILE):
-        return defaultdict(set)
-    with open(WHITELIST_FILE, "r") as f:
-        data = json.load(f)
-        return defaultdict(set, {int(gid): set(uids) for gid, uids in data.items()})
+    data = storage.load("whitelists")
+    return defaultdict(set, {int(gid): set(uids) for gid, uids in data.items()})
 
+@profile_listeners
 class SecurityFeature(commands.Cog):
     antinuke_group = app_commands.Group(name="antinuke", description="Enable/disable anti-nuke features")
     antibotadd_group = app_commands.Group(name="antibotadd", description="Enable/disable anti-bot-add features")
@@ -34,45 +70,69 @@ class SecurityFeature(commands.Cog):
 
     def __init__(self, bot):
         self.bot = bot
-        self.warn_counts = defaultdict(int)  # (guild_id, user_id, type): warning count
-        self.settings = defaultdict(lambda: {
-            "antinuke": True,
-            "antibotadd": True,
-            "antiraid": True
-        })
+        self.nuke_limits = load_nuke_limits()
+        # (guild_id, user_id, action) sliding windows, one detector per shard sharing the limits
+        self.nuke_detector = ShardPartition(bot, lambda: NukeDetector(overrides=self.nuke_limits.overrides))
+        self.settings = load_settings()  # per-guild ANTINUKE | ANTIBOTADD | ANTIRAID bits
         self.whitelists = load_whitelists()
-        self.recent_joins = defaultdict(list)
+        # Changes written by other cluster processes
+        storage.subscribe("whitelists", self._apply_whitelist)
+        storage.subscribe("settings", self.settings.apply)
+        storage.subscribe("nuke_limits", self.nuke_limits.apply_limits)
+        # per shard, guild_id: deque of (monotonic join time, member), oldest first
+        self.recent_joins = ShardPartition(bot, lambda: defaultdict(lambda: deque(maxlen=RECENT_JOINS_CAP)))
         self.raid_threshold = 5
         self.raid_interval = 10
+        self.audit_cache = get_audit_cache(bot)
+        self.punisher = get_punisher(bot)
+        self.log_dispatcher = get_log_dispatcher(bot)
+        self.log_channels = get_log_channels(bot)
 
     # ------------- SLASH COMMANDS (ANTINUKE/ANTIBOTADD/ANTIRAID/ANTIALL/WHITELIST) -------------
     # /antinuke enable/disable
     @antinuke_group.command(name="enable", description="Enable anti-nuke protections")
     async def antinuke_enable(self, interaction: discord.Interaction):
         g = interaction.guild_id
-        self.settings[g]["antinuke"] = True
+        self.settings.set(g, ANTINUKE, True)
+        save_settings(self.settings, g)
         embed = self._status_embed(g, "AntiNuke enabled.")
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
     @antinuke_group.command(name="disable", description="Disable anti-nuke protections")
     async def antinuke_disable(self, interaction: discord.Interaction):
         g = interaction.guild_id
-        self.settings[g]["antinuke"] = False
+        self.settings.set(g, ANTINUKE, False)
+        save_settings(self.settings, g)
         embed = self._status_embed(g, "AntiNuke disabled.")
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
+    @antinuke_group.command(name="limit", description="Set how many actions of a kind are allowed in a time window")
+    @app_commands.describe(action="Action to limit", count="Actions allowed before a ban", seconds="Window length in seconds")
+    @app_commands.choices(action=[app_commands.Choice(name=a, value=a) for a in DEFAULT_NUKE_LIMITS])
+    async def antinuke_limit(self, interaction: discord.Interaction, action: str, count: app_commands.Range[int, 1, 50], seconds: app_commands.Range[int, 1, 3600]):
+        # default_permissions is ignored on subcommands, so gate at runtime
+        if not (interaction.user.guild_permissions.administrator or interaction.user.id == interaction.guild.owner_id):
+            await interaction.response.send_message("You need Administrator permissions to change AntiNuke limits.", ephemeral=True)
+            return
+        g = interaction.guild_id
+        self.nuke_limits.set_limit(g, action, count, seconds)
+        save_nuke_limits(self.nuke_limits, g)
+        await interaction.response.send_message(f"AntiNuke will ban after {count} {action} actions within {seconds}s.", ephemeral=True)
+
     # /antibotadd enable/disable
     @antibotadd_group.command(name="enable", description="Enable anti-bot-add protections")
     async def antibotadd_enable(self, interaction: discord.Interaction):
         g = interaction.guild_id
-        self.settings[g]["antibotadd"] = True
+        self.settings.set(g, ANTIBOTADD, True)
+        save_settings(self.settings, g)
         embed = self._status_embed(g, "AntiBotAdd enabled.")
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
     @antibotadd_group.command(name="disable", description="Disable anti-bot-add protections")
     async def antibotadd_disable(self, interaction: discord.Interaction):
         g = interaction.guild_id
-        self.settings[g]["antibotadd"] = False
+        self.settings.set(g, ANTIBOTADD, False)
+        save_settings(self.settings, g)
         embed = self._status_embed(g, "AntiBotAdd disabled.")
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
@@ -80,14 +140,16 @@ class SecurityFeature(commands.Cog):
     @antiraid_group.command(name="enable", description="Enable anti-raid protections")
     async def antiraid_enable(self, interaction: discord.Interaction):
         g = interaction.guild_id
-        self.settings[g]["antiraid"] = True
+        self.settings.set(g, ANTIRAID, True)
+        save_settings(self.settings, g)
         embed = self._status_embed(g, "AntiRaid enabled.")
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
     @antiraid_group.command(name="disable", description="Disable anti-raid protections")
     async def antiraid_disable(self, interaction: discord.Interaction):
         g = interaction.guild_id
-        self.settings[g]["antiraid"] = False
+        self.settings.set(g, ANTIRAID, False)
+        save_settings(self.settings, g)
         embed = self._status_embed(g, "AntiRaid disabled.")
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
@@ -95,22 +157,16 @@ class SecurityFeature(commands.Cog):
     @antiall_group.command(name="enable", description="Enable all anti features")
     async def antiall_enable(self, interaction: discord.Interaction):
         g = interaction.guild_id
-        self.settings[g] = {
-            "antinuke": True,
-            "antibotadd": True,
-            "antiraid": True
-        }
+        self.settings.set_mask(g, self.settings.all)
+        save_settings(self.settings, g)
         embed = self._status_embed(g, "All anti features enabled.")
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
     @antiall_group.command(name="disable", description="Disable all anti features")
     async def antiall_disable(self, interaction: discord.Interaction):
         g = interaction.guild_id
-        self.settings[g] = {
-            "antinuke": False,
-            "antibotadd": False,
-            "antiraid": False
-        }
+        self.settings.set_mask(g, 0)
+        save_settings(self.settings, g)
         embed = self._status_embed(g, "All anti features disabled.")
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
@@ -120,7 +176,7 @@ class SecurityFeature(commands.Cog):
     async def whitelist_add(self, interaction: discord.Interaction, user: discord.User):
         g = interaction.guild_id
         self.whitelists[g].add(user.id)
-        save_whitelists(self.whitelists)
+        save_whitelists(self.whitelists, g)
         await interaction.response.send_message(f"✅ {user.mention} has been added to the whitelist.", ephemeral=True)
 
     @whitelist_group.command(name="remove", description="Remove a user from the whitelist")
@@ -129,7 +185,7 @@ class SecurityFeature(commands.Cog):
         g = interaction.guild_id
         if user.id in self.whitelists[g]:
             self.whitelists[g].remove(user.id)
-            save_whitelists(self.whitelists)
+            save_whitelists(self.whitelists, g)
             await interaction.response.send_message(f"❌ {user.mention} has been removed from the whitelist.", ephemeral=True)
         else:
             await interaction.response.send_message(f"{user.mention} is not in the whitelist.", ephemeral=True)
@@ -144,15 +200,26 @@ class SecurityFeature(commands.Cog):
             users = [f"<@{uid}>" for uid in user_ids]
             await interaction.response.send_message("Whitelisted users:\n" + "\n".join(users), ephemeral=True)
 
+    def _apply_whitelist(self, guild_id, user_ids):
+        if user_ids is None:
+            self.whitelists.pop(int(guild_id), None)
+        else:
+            self.whitelists[int(guild_id)] = set(user_ids)
+
+    def cog_unload(self):
+        storage.unsubscribe("whitelists", self._apply_whitelist)
+        storage.unsubscribe("settings", self.settings.apply)
+        storage.unsubscribe("nuke_limits", self.nuke_limits.apply_limits)
+
     def _is_whitelisted(self, guild_id, user_id):
         return user_id in self.whitelists[guild_id]
 
     def _status_embed(self, guild_id, msg):
-        st = self.settings[guild_id]
+        st = self.settings.mask(guild_id)
         status_line = (
-            f"AntiNuke {get_status_emoji(st.get('antinuke', False))} | "
-            f"AntiBotAdd {get_status_emoji(st.get('antibotadd', False))} | "
-            f"AntiRaid {get_status_emoji(st.get('antiraid', False))}"
+            f"AntiNuke {get_status_emoji(st & ANTINUKE)} | "
+            f"AntiBotAdd {get_status_emoji(st & ANTIBOTADD)} | "
+            f"AntiRaid {get_status_emoji(st & ANTIRAID)}"
         )
         embed = discord.Embed(
             title="SecureAura Anti Features Status",
@@ -172,7 +239,7 @@ class SecurityFeature(commands.Cog):
             async for entry in guild.audit_logs(limit=1, action=discord.AuditLogAction.bot_add):
                 adder = entry.user
         except Exception:
-            adder = guild.owner
+            adder = await resolve_owner(guild)
 
         embed = discord.Embed(
             title="AntiNuke Features Enabled ☑️",
@@ -221,105 +288,99 @@ class SecurityFeature(commands.Cog):
 
     async def _handle_channel_event(self, channel, action):
         guild = channel.guild
-        if not self.settings[guild.id]["antinuke"]:
-            return
-        entry = None
-        try:
-            async for e in guild.audit_logs(limit=1, action=getattr(discord.AuditLogAction, f"channel_{action}")):
-                entry = e
-                break
-        except Exception:
+        if not self.settings.has(guild.id, ANTINUKE):
             return
+        with phase("actor"):
+            entry = await self.audit_cache.resolve(guild, getattr(discord.AuditLogAction, f"channel_{action}"), channel.id)
         if entry is None:
             return
-        user = entry.user
-        bot_member = guild.me
-        # Only punish users below the bot's top role and not whitelisted
-        if user is None or user.bot or user.top_role >= bot_member.top_role or self._is_whitelisted(guild.id, user.id):
-            return
-
-        key = (guild.id, user.id, "channel")
-        self.warn_counts[key] += 1
-
-        embed = discord.Embed(
-            title="Channel Security Alert",
-            description=f"{user.mention} tried to {action} a channel: {getattr(channel, 'mention', channel.name)}",
-            color=discord.Color.orange()
+        await self._nuke_strike(
+            guild, entry.user, "channel", "Channel Security Alert",
+            f"tried to {action} a channel: {getattr(channel, 'mention', channel.name)}", f"channel {action}"
         )
-        embed.add_field(name="Count", value=str(self.warn_counts[key]))
-        embed.set_footer(text=f"User ID: {user.id}")
-
-        if self.warn_counts[key] < 3:
-            await self._log_or_owner_dm(guild, embed, user.mention)
-        else:
-            try:
-                await guild.ban(user, reason=f"Exceeded channel {action} limit by SecureAura", delete_message_days=0)
-                embed.title = "User Banned"
-                embed.color = discord.Color.red()
-                embed.description += f"\nUser has been banned after 3 warnings for channel {action}."
-                await self._log_or_owner_dm(guild, embed, user.mention)
-            except Exception:
-                pass
-            self.warn_counts[key] = 0
 
     async def _handle_role_event(self, role, action):
         guild = role.guild
-        if not self.settings[guild.id]["antinuke"]:
-            return
-        entry = None
-        try:
-            async for e in guild.audit_logs(limit=1, action=getattr(discord.AuditLogAction, f"role_{action}")):
-                entry = e
-                break
-        except Exception:
+        if not self.settings.has(guild.id, ANTINUKE):
             return
+        with phase("actor"):
+            entry = await self.audit_cache.resolve(guild, getattr(discord.AuditLogAction, f"role_{action}"), role.id)
         if entry is None:
             return
-        user = entry.user
-        bot_member = guild.me
-        # Only punish users below the bot's top role and not whitelisted
-        if user is None or user.bot or user.top_role >= bot_member.top_role or self._is_whitelisted(guild.id, user.id):
-            return
+        await self._nuke_strike(
+            guild, entry.user, "role", "Role Security Alert",
+            f"tried to {action} a role: {getattr(role, 'name', '')}", f"role {action}"
+        )
 
-        key = (guild.id, user.id, "role")
-        self.warn_counts[key] += 1
+    async def _as_member(self, guild, user):
+        # Audit entries carry a plain User when the member is not cached
+        if user is None or isinstance(user, discord.Member):
+            return user
+        # Already banned or kicked: a fetch would only 404
+        if self.punisher.recently_removed(guild.id, user.id):
+            return user
+        return await resolve_member(guild, user.id) or user
+
+    def _is_exempt(self, guild, user):
+        # Only punish users below the bot's top role and not whitelisted
+        if user is None or user.bot or self._is_whitelisted(guild.id, user.id):
+            return True
+        top_role = getattr(user, "top_role", None)
+        return top_role is not None and top_role >= guild.me.top_role
+
+    async def _nuke_strike(self, guild, user, kind, title, what, label):
+        """Count one destructive action and ban the actor once over the limit."""
+        with phase("actor"):
+            user = await self._as_member(guild, user)
+        with phase("decision"):
+            if self._is_exempt(guild, user):
+                return
+            detector = self.nuke_detector.get(guild.id)
+            count, limit = detector.hit(guild.id, user.id, kind)
+            window = detector.limit(guild.id, kind)[1]
 
         embed = discord.Embed(
-            title="Role Security Alert",
-            description=f"{user.mention} tried to {action} a role: {getattr(role, 'name', '')}",
+            title=title,
+            description=f"{user.mention} {what}",
             color=discord.Color.orange()
         )
-        embed.add_field(name="Count", value=str(self.warn_counts[key]))
+        embed.add_field(name="Count", value=f"{count}/{limit} in {window}s")
         embed.set_footer(text=f"User ID: {user.id}")
 
-        if self.warn_counts[key] < 3:
+        if count < limit:
             await self._log_or_owner_dm(guild, embed, user.mention)
-        else:
-            try:
-                await guild.ban(user, reason=f"Exceeded role {action} limit by SecureAura", delete_message_days=0)
-                embed.title = "User Banned"
-                embed.color = discord.Color.red()
-                embed.description += f"\nUser has been banned after 3 warnings for role {action}."
-                await self._log_or_owner_dm(guild, embed, user.mention)
-            except Exception:
-                pass
-            self.warn_counts[key] = 0
+            return
+        detector.reset(guild.id, user.id, kind)
+        try:
+            with phase("punish"):
+                await self.punisher.ban(guild, user, reason=f"Exceeded {label} limit by SecureAura", delete_message_days=0)
+            embed.title = "User Banned"
+            embed.color = discord.Color.red()
+            embed.description += f"\nUser has been banned after {limit} {label} actions within {window}s."
+            await self._log_or_owner_dm(guild, embed, user.mention)
+        except Exception:
+            pass
 
-    # ------------ ANTI-BOT-ADD (KICK MEMBER WHO ADDED BOT) ------------
+    # ------------ AUDIT LOG: ANTI-NUKE (BAN/KICK/WEBHOOK/EMOJI) + ANTI-BOT-ADD ------------
     @commands.Cog.listener()
     async def on_audit_log_entry_create(self, entry):
         guild = entry.guild
-        if not self.settings[guild.id]["antibotadd"]:
+        nuke = AUDIT_NUKE_ACTIONS.get(entry.action)
+        if nuke is not None:
+            if self.settings.has(guild.id, ANTINUKE):
+                kind, what = nuke
+                await self._nuke_strike(guild, entry.user, kind, "AntiNuke Alert", f"tried to {what}.", what)
+            return
+        if not self.settings.has(guild.id, ANTIBOTADD):
             return
         if entry.action == discord.AuditLogAction.bot_add:
-            user = entry.user
+            with phase("actor"):
+                user = await self._as_member(guild, entry.user)
             bot_added = entry.target
-            bot_member = guild.me
-            # Only punish users below the bot's top role and not whitelisted
-            if (user is not None and not user.bot and user.top_role < bot_member.top_role
-                and not self._is_whitelisted(guild.id, user.id)):
+            if not self._is_exempt(guild, user):
                 try:
-                    await guild.kick(user, reason="Unauthorized bot add by SecureAura")
+                    with phase("punish"):
+                        await self.punisher.kick(guild, user, reason="Unauthorized bot add by SecureAura")
                 except Exception:
                     pass
                 embed = discord.Embed(
@@ -331,7 +392,8 @@ class SecurityFeature(commands.Cog):
             # Ban the newly added bot unless whitelisted
             if (bot_added is not None and getattr(bot_added, "bot", False) and not self._is_whitelisted(guild.id, bot_added.id)):
                 try:
-                    await guild.ban(bot_added, reason="Unauthorized bot added by SecureAura")
+                    with phase("punish"):
+                        await self.punisher.ban(guild, bot_added, reason="Unauthorized bot added by SecureAura")
                 except Exception:
                     pass
 
@@ -339,52 +401,63 @@ class SecurityFeature(commands.Cog):
     @commands.Cog.listener()
     async def on_member_join(self, member: discord.Member):
         guild = member.guild
-        if not self.settings[guild.id]["antiraid"]:
+        if not self.settings.has(guild.id, ANTIRAID):
             return
-        now = datetime.utcnow()
-        if not member.bot:
-            self.recent_joins[guild.id] = [t for t in self.recent_joins[guild.id] if (now - t).total_seconds() < self.raid_interval]
-            self.recent_joins[guild.id].append(now)
-            if len(self.recent_joins[guild.id]) >= self.raid_threshold:
-                to_ban = []
-                for m in guild.members:
-                    if not m.bot and m.joined_at and (now - m.joined_at).total_seconds() < self.raid_interval:
-                        to_ban.append(m)
-                for m in to_ban:
-                    try:
-                        await guild.ban(m, reason="Anti-raid triggered: suspected raid join.")
-                    except Exception:
-                        pass
-                embed = discord.Embed(
-                    title="Anti-Raid Triggered",
-                    description=f"Banned {len(to_ban)} members for suspected raid join.",
-                    color=discord.Color.red()
-                )
-                await self._log_or_owner_dm(guild, embed)
-                self.recent_joins[guild.id] = []
+        if member.bot:
+            return
+        now = time.monotonic()
+        joins = self.recent_joins.get(guild.id)[guild.id]
+        while joins and now - joins[0][0] >= self.raid_interval:
+            joins.popleft()
+        joins.append((now, member))
+        if len(joins) >= self.raid_threshold:
+            to_ban = [m for _, m in joins]
+            joins.clear()
+            with phase("punish"):
+                banned = await self._bulk_ban(guild, to_ban, "Anti-raid triggered: suspected raid join.")
+            embed = discord.Embed(
+                title="Anti-Raid Triggered",
+                description=f"Banned {banned} members for suspected raid join.",
+                color=discord.Color.red()
+            )
+            await self._log_or_owner_dm(guild, embed)
+
+    async def _bulk_ban(self, guild, members, reason):
+        banned = 0
+        for i in range(0, len(members), BULK_BAN_CHUNK):
+            chunk = members[i:i + BULK_BAN_CHUNK]
+            try:
+                result = await self.punisher.bulk_ban(guild, chunk, reason=reason, delete_message_seconds=86400)
+                banned += len(result.banned)
+                continue
+            except Exception:
+                pass
+            # bulk_ban needs Manage Server as well; fall back to single bans
+            results = await asyncio.gather(
+                *(self.punisher.ban(guild, m, reason=reason) for m in chunk),
+                return_exceptions=True
+            )
+            banned += sum(1 for r in results if r is True)
+        return banned
 
     # ------------ LOG CHANNEL HELPERS ------------
     def _get_log_channel(self, guild):
         log_channels = getattr(self.bot, "log_channels", {})
         if guild.id in log_channels:
-            return guild.get_channel(log_channels[guild.id])
-        channel = discord.utils.get(guild.text_channels, name="logs")
-        if channel and hasattr(self.bot, "log_channels"):
-            self.bot.log_channels[guild.id] = channel.id
-        return channel
+            channel = guild.get_channel(log_channels[guild.id])
+            if channel:
+                return channel
+        return self.log_channels.get(guild, "logs")
 
     async def _log_or_owner_dm(self, guild, embed, mention=None):
-        log_channel = self._get_log_channel(guild)
-        if log_channel:
-            try:
-                await log_channel.send(embed=embed, content=mention or None)
-            except Exception:
-                pass
-        else:
-            try:
-                await guild.owner.send(embed=embed, content=mention or None)
-            except Exception:
-                pass
+        with phase("log"):
+            log_channel = self._get_log_channel(guild)
+            # Batched, and queued behind any pending bans/kicks for this guild
+            owner = await resolve_owner(guild)
+            target = log_channel or owner
+            if target is None:
+                return
+            self.log_dispatcher.post(guild, target, embed, mention, fallback=owner)
 
 async def setup(bot):
     await bot.add_cog(SecurityFeature(bot))
\ No newline at end of file
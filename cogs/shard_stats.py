@@ -0,0 +1,50 @@
+import discord
+from discord.ext import commands
+
+class ShardStats(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+
+    def _state_sizes(self):
+        # Per-shard sizes of the partitioned security state, if those cogs are loaded
+        sizes = {}
+        security = self.bot.get_cog("SecurityFeature")
+        premium = self.bot.get_cog("PremiumSecurity")
+        sources = []
+        if security:
+            sources += [("raid", security.recent_joins), ("nuke", security.nuke_detector)]
+        if premium:
+            sources += [("spam", premium.spam_window), ("ghost", premium.ghost_pings), ("flood", premium.content_flood)]
+        for name, partition in sources:
+            for shard_id, size in partition.sizes().items():
+                sizes.setdefault(shard_id, []).append(f"{name} {size}")
+        return sizes
+
+    @commands.command(name="shards")
+    @commands.is_owner()
+    async def shards(self, ctx):
+        counts = getattr(self.bot, "shard_event_counts", {})
+        sizes = self._state_sizes()
+        if getattr(self.bot, "shards", None):
+            latencies = {shard_id: info.latency for shard_id, info in self.bot.shards.items()}
+        else:
+            latencies = {0: self.bot.latency}
+        embed = discord.Embed(title="Shard Status", color=discord.Color.blue())
+        for shard_id, latency in sorted(latencies.items()):
+            guilds = sum(1 for g in self.bot.guilds if (g.shard_id or 0) == shard_id)
+            events = counts.get(shard_id)
+            top = ", ".join(f"{name} {n}" for name, n in events.most_common(3)) if events else "none"
+            embed.add_field(
+                name=f"Shard {shard_id}",
+                value=(
+                    f"Latency: {latency * 1000:.0f} ms\n"
+                    f"Guilds: {guilds}\n"
+                    f"Events: {sum(events.values()) if events else 0} ({top})\n"
+                    f"State: {', '.join(sizes.get(shard_id, [])) or 'empty'}"
+                ),
+                inline=True
+            )
+        await ctx.send(embed=embed)
+
+async def setup(bot):
+    await bot.add_cog(ShardStats(bot))
@@ -1,41 +1,76 @@
 import os
+import sys
+import time
 import discord
 from discord.ext import commands
 
 TOKEN = os.environ['DISCORD_TOKEN']
 
-intents = discord.Intents.all()
-bot = commands.Bot(command_prefix="?", intents=intents, case_insensitive=True)
+from utils.sharding import SecureAuraBot, ShardedSecureAuraBot
+from utils.gateway import gateway_options
+from utils.startup import load_extensions_concurrently, sync_command_tree
+from utils import metrics
+
+# Sharding: set SHARD_COUNT (and optionally SHARD_IDS="0,1,2") or SHARDED=1
+# to let discord.py pick the shard count. Unset runs a single connection.
+SHARD_COUNT = int(os.environ["SHARD_COUNT"]) if os.environ.get("SHARD_COUNT") else None
+SHARD_IDS = [int(i) for i in os.environ["SHARD_IDS"].split(",")] if os.environ.get("SHARD_IDS") else None
+SHARDED = os.environ.get("SHARDED") == "1" or SHARD_COUNT is not None or SHARD_IDS is not None
+if SHARD_IDS is not None and SHARD_COUNT is None:
+    sys.exit("SHARD_IDS requires SHARD_COUNT (the total number of shards across all processes)")
+if SHARD_IDS is not None and any(not 0 <= i < SHARD_COUNT for i in SHARD_IDS):
+    sys.exit(f"SHARD_IDS must be between 0 and {SHARD_COUNT - 1} for SHARD_COUNT={SHARD_COUNT}")
+
+# Intents and member cache: SECUREAURA_GATEWAY=full (default) or lean
+options = gateway_options()
+if SHARDED:
+    bot = ShardedSecureAuraBot(command_prefix="?", case_insensitive=True,
+                               shard_count=SHARD_COUNT, shard_ids=SHARD_IDS, **options)
+else:
+    bot = SecureAuraBot(command_prefix="?", case_insensitive=True, **options)
 bot.remove_command('help')
 
 # Persistent log channel mapping loaded before extensions
-import json
-import os as _os
+from utils.storage import storage
 
-LOG_CHANNELS_FILE = "log_channels.json"
-
-def save_log_channels(log_channels):
-    with open(LOG_CHANNELS_FILE, "w") as f:
-        json.dump({str(k): v for k, v in log_channels.items()}, f)
+def save_log_channels(log_channels, guild_id=None):
+    rows = None if guild_id is None else {guild_id: log_channels.get(guild_id)}
+    storage.save("log_channels", lambda: {str(k): v for k, v in log_channels.items()}, rows)
 
 def load_log_channels():
-    if not _os.path.exists(LOG_CHANNELS_FILE):
-        return {}
-    with open(LOG_CHANNELS_FILE, "r") as f:
-        return {int(k): v for k, v in json.load(f).items()}
+    return {int(k): v for k, v in storage.load("log_channels").items()}
 
 bot.log_channels = load_log_channels()
 
+@bot.event
+async def on_shard_ready(shard_id):
+    print(f"Shard {shard_id} ready.")
+
 @bot.event
 async def on_ready():
     await bot.change_presence(activity=discord.Game(name="Moderating the server!"))
     print(f'Logged in as {bot.user} (ID: {bot.user.id})')
     print('------')
+    # on_ready fires again after reconnects; the tree only needs checking once
+    if getattr(bot, "tree_checked", False):
+        return
     try:
-        synced = await bot.tree.sync()
-        print(f"Synced {len(synced)} slash commands.")
+        synced = await sync_command_tree(bot)
     except Exception as e:
+        # Left unchecked so the next on_ready tries again
         print(f"Error syncing commands: {e}")
+        return
+    bot.tree_checked = True
+    if synced is None:
+        print("Slash commands unchanged, skipped sync.")
+    else:
+        print(f"Synced {synced} slash commands.")
+
+@bot.command(name="sync")
+@commands.is_owner()
+async def sync_commands(ctx):
+    synced = await sync_command_tree(bot, force=True)
+    await ctx.send(f"Synced {synced} slash commands.")
 
 # Load cogs
 initial_extensions = [
@@ -46,16 +81,29 @@ initial_extensions = [
     'cogs.invite_log',
     'cogs.premium_security',
     'cogs.greet_pannel',
-    'cogs.help'
+    'cogs.help',
+    'cogs.shard_stats',
+    'cogs.profiler',
+    'cogs.backup'
 ]
 
 async def load_extensions():
-    for ext in initial_extensions:
-        await bot.load_extension(ext)
+    start = time.perf_counter()
+    bot.startup_timings = await load_extensions_concurrently(bot, initial_extensions)
+    for ext, seconds in sorted(bot.startup_timings.items(), key=lambda t: -t[1]):
+        print(f"Loaded {ext} in {seconds * 1000:.0f} ms")
+    print(f"Loaded {len(bot.startup_timings)}/{len(initial_extensions)} extensions in {(time.perf_counter() - start) * 1000:.0f} ms")
 
 async def main():
     await load_extensions()
-    await bot.start(TOKEN)
+    # Opt-in Prometheus endpoint: set SECUREAURA_METRICS_PORT
+    if metrics.METRICS_PORT:
+        await metrics.serve(metrics.install(bot))
+    try:
+        await bot.start(TOKEN)
+    finally:
+        # Write out anything still waiting in the write-behind queue
+        await storage.flush()
 
 if __name__ == "__main__":
     import asyncio
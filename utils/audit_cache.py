@@ -0,0 +1,151 @@
+import asyncio
+import time
+from collections import defaultdict, deque
+from datetime import timedelta
+import discord
+
+class AuditLogCache:
+    """Recent audit log entries per guild, fed by on_audit_log_entry_create.
+
+    Entries live in a per-guild ring buffer and are indexed by
+    (action, target_id) so handlers can find who did something without a
+    REST call. Entries older than ``max_age`` are never served, so they are
+    dropped as new ones arrive and by a sweep over idle guilds. If the
+    entry has not arrived yet, ``resolve`` waits briefly for it and only
+    then falls back to ``guild.audit_logs``.
+
+    Update events often arrive before their entry, so a target changed
+    twice in a row still indexes the first actor. Callers pass ``since``,
+    the time their event was received: an entry created more than
+    ``slack`` before it, or already served for an earlier event, is
+    skipped.
+    """
+
+    def __init__(self, size=256, max_age=30.0, wait=1.5, slack=3.0):
+        self.size = size
+        self.max_age = timedelta(seconds=max_age)
+        self.wait = wait
+        self.slack = timedelta(seconds=slack)
+        self._rings = defaultdict(lambda: deque(maxlen=self.size))
+        self._index = {}      # (guild_id, action, target_id): entry
+        self._seen = set()    # entry ids currently held in a ring
+        self._served = {}     # entry id: latest ``since`` it was served for
+        self._waiters = defaultdict(list)   # key: [(since, future)]
+        self._next_sweep = time.monotonic() + max_age
+
+    def record(self, entry):
+        if entry.id in self._seen:
+            return
+        now = discord.utils.utcnow()
+        ring = self._rings[entry.guild.id]
+        self._expire(ring, now)
+        if len(ring) == ring.maxlen:
+            self._drop(ring.popleft())
+        ring.append(entry)
+        if time.monotonic() >= self._next_sweep:
+            self._sweep(now)
+        self._seen.add(entry.id)
+        for key in self._keys(entry):
+            self._index[key] = entry
+            for since, fut in list(self._waiters.get(key, ())):
+                if not fut.done() and self._usable(entry, since):
+                    self._serve(entry, since)
+                    fut.set_result(entry)
+
+    def _drop(self, old):
+        self._seen.discard(old.id)
+        self._served.pop(old.id, None)
+        for key in self._keys(old):
+            if self._index.get(key) is old:
+                del self._index[key]
+
+    def _expire(self, ring, now):
+        while ring and now - ring[0].created_at > self.max_age:
+            self._drop(ring.popleft())
+
+    def _sweep(self, now):
+        # Guilds with no new entries would otherwise hold their last ring forever
+        self._next_sweep = time.monotonic() + self.max_age.total_seconds()
+        for guild_id in list(self._rings):
+            ring = self._rings[guild_id]
+            self._expire(ring, now)
+            if not ring:
+                del self._rings[guild_id]
+
+    def _keys(self, entry):
+        target_id = getattr(entry.target, "id", None)
+        keys = [(entry.guild.id, entry.action, None)]
+        if target_id is not None:
+            keys.append((entry.guild.id, entry.action, target_id))
+        return keys
+
+    def _usable(self, entry, since):
+        if discord.utils.utcnow() - entry.created_at > self.max_age:
+            return False
+        if since is None:
+            return True
+        if entry.created_at < since - self.slack:
+            return False
+        served = self._served.get(entry.id)
+        return served is None or served >= since
+
+    def _serve(self, entry, since):
+        if since is not None and entry.id in self._seen:
+            self._served[entry.id] = max(since, self._served.get(entry.id, since))
+
+    def get(self, guild_id, action, target_id=None, since=None):
+        entry = self._index.get((guild_id, action, target_id))
+        if entry and self._usable(entry, since):
+            return entry
+        return None
+
+    async def resolve(self, guild, action, target_id=None, since=None):
+        """Return the audit entry for ``action`` on ``target_id`` or None.
+
+        ``since`` is when the triggering event was received; see the class
+        docstring.
+        """
+        entry = self.get(guild.id, action, target_id, since)
+        if entry:
+            self._serve(entry, since)
+            return entry
+        key = (guild.id, action, target_id)
+        waiter = (since, asyncio.get_running_loop().create_future())
+        self._waiters[key].append(waiter)
+        try:
+            return await asyncio.wait_for(waiter[1], timeout=self.wait)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            waiters = self._waiters.get(key)
+            if waiters and waiter in waiters:
+                waiters.remove(waiter)
+                if not waiters:
+                    del self._waiters[key]
+        return await self._fetch(guild, action, target_id, since)
+
+    async def _fetch(self, guild, action, target_id, since):
+        try:
+            async for e in guild.audit_logs(limit=5, action=action):
+                if discord.utils.utcnow() - e.created_at > self.max_age:
+                    break
+                if target_id is None or getattr(e.target, "id", None) == target_id:
+                    self.record(e)
+                    if not self._usable(e, since):
+                        continue
+                    self._serve(e, since)
+                    return e
+        except Exception:
+            pass
+        return None
+
+def get_audit_cache(bot):
+    """Return the bot-wide audit cache, creating and wiring it on first use."""
+    cache = getattr(bot, "audit_cache", None)
+    if cache is None:
+        cache = bot.audit_cache = AuditLogCache()
+
+        async def on_audit_log_entry_create(entry):
+            cache.record(entry)
+        bot.add_listener(on_audit_log_entry_create)
+    return cache
@@ -0,0 +1,89 @@
+import asyncio
+import heapq
+from datetime import datetime
+
+MAX_SLEEP = 3600   # re-check at least hourly so clock jumps cannot delay an expiry much
+
+class ExpiryScheduler:
+    """Calls ``on_expire(key)`` when each key's expiry time passes.
+
+    Expiry times live in a min-heap, so scheduling is O(log n) and the
+    runner only sleeps until the earliest one. Rescheduled or cancelled
+    keys leave stale heap entries that are skipped when popped, and the
+    heap is rebuilt once stale entries outnumber live ones. Times are
+    naive UTC datetimes, like the premium table's.
+    """
+
+    def __init__(self, on_expire):
+        self.on_expire = on_expire
+        self._heap = []    # (expires, key)
+        self._due = {}     # key: expires
+        self._wake = asyncio.Event()
+        self._task = None
+
+    def schedule(self, key, expires):
+        if self._due.get(key) == expires:
+            return
+        self._due[key] = expires
+        heapq.heappush(self._heap, (expires, key))
+        if self._heap[0][1] == key:
+            self._wake.set()
+        self._compact()
+
+    def cancel(self, key):
+        if self._due.pop(key, None) is not None:
+            self._compact()
+
+    def rebuild(self, items):
+        """Replace everything scheduled with ``items``, an iterable of (key, expires)."""
+        self._due = dict(items)
+        self._heap = [(expires, key) for key, expires in self._due.items()]
+        heapq.heapify(self._heap)
+        self._wake.set()
+
+    def next_due(self):
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def __len__(self):
+        return len(self._due)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def _drop_stale(self):
+        heap = self._heap
+        while heap and self._due.get(heap[0][1]) != heap[0][0]:
+            heapq.heappop(heap)
+
+    def _compact(self):
+        if len(self._heap) > 2 * len(self._due) + 64:
+            self._heap = [(expires, key) for key, expires in self._due.items()]
+            heapq.heapify(self._heap)
+
+    async def _run(self):
+        while True:
+            self._wake.clear()
+            now = datetime.utcnow()
+            self._drop_stale()
+            while self._heap and self._heap[0][0] <= now:
+                expires, key = heapq.heappop(self._heap)
+                del self._due[key]
+                try:
+                    await self.on_expire(key)
+                except Exception as e:
+                    print(f"Error expiring {key}: {e}")
+                self._drop_stale()
+            delay = MAX_SLEEP
+            if self._heap:
+                delay = min(delay, max(0.0, (self._heap[0][0] - datetime.utcnow()).total_seconds()))
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
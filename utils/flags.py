@@ -0,0 +1,58 @@
+def bits_for(names):
+    """Map each feature name to its own bit, in declaration order."""
+    return {name: 1 << i for i, name in enumerate(names)}
+
+def to_mask(value, bits):
+    """Accept a stored int mask or a legacy {name: bool} dict."""
+    if isinstance(value, dict):
+        mask = 0
+        for name, on in value.items():
+            if on and name in bits:
+                mask |= bits[name]
+        return mask
+    return int(value or 0)
+
+class GuildFlags:
+    """Per-guild feature bitmasks.
+
+    Only guilds that differ from ``default`` are stored, as one int each, so
+    checking a feature is a dict lookup plus a single bit test.
+    """
+
+    def __init__(self, names, default=None):
+        self.bits = bits_for(names)
+        self.all = sum(self.bits.values())
+        self.default = self.all if default is None else default
+        self._masks = {}
+
+    def mask(self, guild_id):
+        return self._masks.get(guild_id, self.default)
+
+    def has(self, guild_id, bit):
+        return self._masks.get(guild_id, self.default) & bit != 0
+
+    def stored(self, guild_id):
+        """The persisted mask for a guild, or None when it uses the default."""
+        return self._masks.get(guild_id)
+
+    def set_mask(self, guild_id, mask):
+        if mask == self.default:
+            self._masks.pop(guild_id, None)
+        else:
+            self._masks[guild_id] = mask
+
+    def set(self, guild_id, bit, on):
+        mask = self.mask(guild_id)
+        self.set_mask(guild_id, mask | bit if on else mask & ~bit)
+
+    def apply(self, guild_id, value):
+        """Apply one stored row (None when it was deleted)."""
+        self.set_mask(int(guild_id), self.default if value is None else to_mask(value, self.bits))
+
+    def load(self, data):
+        self._masks = {}
+        for gid, value in data.items():
+            self.set_mask(int(gid), to_mask(value, self.bits))
+
+    def dump(self):
+        return {str(gid): mask for gid, mask in self._masks.items()}
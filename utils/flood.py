@@ -0,0 +1,123 @@
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+
+MENTION_RE = re.compile(r"<(?:@[!&]?|#)\d+>")
+URL_RE = re.compile(r"https?://([^\s/<>]+)([^\s<>]*)", re.IGNORECASE)
+NOISE_RE = re.compile(r"[\W\d_]+")   # punctuation, digits and spacing raiders vary per copy
+MIN_TEXT = 12   # shorter messages without links or files are too common to fingerprint
+
+def content_fingerprint(message):
+    """Hash of a message's normalized text, link targets and attachment shapes.
+
+    Copies that differ only in case, spacing, punctuation, digits, mentions
+    or Unicode look-alikes hash the same. Returns None for short plain
+    messages ("hi", "lol") that many people legitimately send.
+    """
+    content = message.content or ""
+    links = ()
+    if "://" in content:
+        links = tuple(sorted({
+            (host.lower().removeprefix("www."), path.rstrip("/").lower())
+            for host, path in URL_RE.findall(content)
+        }))
+        content = URL_RE.sub(" ", content)
+    text = NOISE_RE.sub("", MENTION_RE.sub("", unicodedata.normalize("NFKC", content)).casefold())
+    files = tuple(sorted(
+        (a.size, a.filename.rsplit(".", 1)[-1].lower()) for a in message.attachments
+    )) if message.attachments else ()
+    if not links and not files and len(text) < MIN_TEXT:
+        return None
+    return hash((text, links, files))
+
+class _Flood:
+    __slots__ = ("start", "authors", "channels", "fired")
+
+    def __init__(self, start):
+        self.start = start
+        self.authors = {}     # author_id: None, insertion ordered
+        self.channels = set()
+        self.fired = False
+
+class ContentFloodDetector:
+    """Guild-wide repeated-content detector.
+
+    Each guild keeps a fingerprint table ordered by when a fingerprint was
+    first seen; an entry covers ``window`` seconds from that moment and
+    is replaced by a fresh one after. A fingerprint trips once it has been
+    posted by ``max_authors`` different people, or in ``max_channels``
+    different channels by at least two people, so one member cross-posting
+    an announcement never trips it alone. Expired entries are dropped from the front of the
+    table, each guild holds at most ``max_per_guild`` fingerprints and at
+    most ``max_guilds`` guilds are tracked (least recently active go first),
+    so every hit is O(1) amortized and memory stays bounded.
+    """
+
+    def __init__(self, max_authors=6, max_channels=4, window=30.0, max_per_guild=1024,
+                 max_guilds=10_000, max_tracked_authors=50):
+        self.max_authors = max_authors
+        self.max_channels = max_channels
+        self.window = window
+        self.max_per_guild = max_per_guild
+        self.max_guilds = max_guilds
+        self.max_tracked_authors = max_tracked_authors
+        self._guilds = OrderedDict()   # guild_id: (last hit, OrderedDict fingerprint: _Flood)
+
+    def hit(self, guild_id, fingerprint, author_id, channel_id, max_authors=None, max_channels=None):
+        """Record a message; return the author ids to punish (usually empty)."""
+        max_authors = max_authors or self.max_authors
+        max_channels = max_channels or self.max_channels
+        now = time.monotonic()
+        state = self._guilds.get(guild_id)
+        if state is None:
+            table = OrderedDict()
+        else:
+            table = state[1]
+            self._guilds.move_to_end(guild_id)
+        self._guilds[guild_id] = (now, table)
+        self._expire(table, now)
+
+        flood = table.get(fingerprint)
+        if flood is None:
+            flood = table[fingerprint] = _Flood(now)
+            if len(table) > self.max_per_guild:
+                table.popitem(last=False)
+        self._evict(now)
+
+        new_author = author_id not in flood.authors
+        if new_author and len(flood.authors) < self.max_tracked_authors:
+            flood.authors[author_id] = None
+        if len(flood.channels) < max_channels:
+            flood.channels.add(channel_id)
+
+        if flood.fired:
+            # Already flagged: everyone else who joins in is flagged too
+            return [author_id] if new_author else []
+        if len(flood.authors) >= max_authors or (len(flood.channels) >= max_channels and len(flood.authors) > 1):
+            flood.fired = True
+            return list(flood.authors)
+        return []
+
+    def forget(self, guild_id):
+        self._guilds.pop(guild_id, None)
+
+    def _expire(self, table, now):
+        while table:
+            flood = next(iter(table.values()))
+            if now - flood.start < self.window:
+                break
+            table.popitem(last=False)
+
+    def _evict(self, now):
+        guilds = self._guilds
+        while len(guilds) > self.max_guilds:
+            guilds.popitem(last=False)
+        while guilds:
+            last, _ = next(iter(guilds.values()))
+            if now - last < self.window:
+                break
+            guilds.popitem(last=False)
+
+    def __len__(self):
+        return sum(len(table) for _, table in self._guilds.values())
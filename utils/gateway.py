@@ -0,0 +1,110 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+import discord
+
+def _flag(name, default):
+    value = os.environ.get(name)
+    return default if value is None else value.lower() in ("1", "true", "yes", "on")
+
+def lean_intents():
+    """Only the gateway events the cogs listen to."""
+    intents = discord.Intents.default()
+    intents.members = True           # on_member_join (anti-raid, greetings)
+    intents.message_content = True   # prefix commands, anti-spam
+    intents.presences = False
+    intents.typing = False
+    intents.voice_states = False
+    return intents
+
+def gateway_options(profile=None):
+    """Client kwargs for the ``full`` or ``lean`` gateway profile.
+
+    ``full`` keeps discord.py's defaults with every intent enabled. ``lean``
+    drops unused intents, caches no members besides the bot itself, skips
+    member chunking at startup and keeps a smaller message cache; the cogs
+    fetch members on demand instead. Individual settings can be overridden
+    with CHUNK_GUILDS and MAX_MESSAGES.
+    """
+    profile = (profile or os.environ.get("SECUREAURA_GATEWAY", "full")).lower()
+    if profile == "lean":
+        options = {
+            "intents": lean_intents(),
+            "member_cache_flags": discord.MemberCacheFlags.none(),
+            "chunk_guilds_at_startup": False,
+            "max_messages": 200,
+        }
+    elif profile == "full":
+        options = {
+            "intents": discord.Intents.all(),
+            "chunk_guilds_at_startup": True,
+            "max_messages": 1000,
+        }
+    else:
+        raise ValueError(f"Unknown gateway profile: {profile!r} (use 'full' or 'lean')")
+    options["chunk_guilds_at_startup"] = _flag("CHUNK_GUILDS", options["chunk_guilds_at_startup"])
+    if os.environ.get("MAX_MESSAGES"):
+        options["max_messages"] = int(os.environ["MAX_MESSAGES"]) or None
+    return options
+
+MEMBER_TTL = 60.0       # seconds a fetched member is reused
+MISSING_TTL = 10.0      # seconds a "not in the guild" answer is reused
+MAX_FETCHED = 10_000
+
+_fetched = OrderedDict()   # (guild_id, user_id): (expires, Member or None)
+_fetching = {}             # (guild_id, user_id): Future of an in-flight fetch
+
+async def resolve_member(guild, user_id):
+    """Cached member, else fetched over REST; None if they are not in the guild.
+
+    Without a member cache every audit event of a nuke would fetch the same
+    actor again, so fetch results (misses included) are kept briefly and
+    concurrent lookups share one request.
+    """
+    member = guild.get_member(user_id)
+    if member is not None:
+        return member
+    key = (guild.id, user_id)
+    now = time.monotonic()
+    cached = _fetched.get(key)
+    if cached is not None and cached[0] > now:
+        return cached[1]
+    fut = _fetching.get(key)
+    if fut is not None:
+        return await asyncio.shield(fut)
+    fut = _fetching[key] = asyncio.get_running_loop().create_future()
+    member, ttl = None, None
+    try:
+        member = await guild.fetch_member(user_id)
+        ttl = MEMBER_TTL
+    except discord.NotFound:
+        member, ttl = None, MISSING_TTL
+    except discord.HTTPException:
+        # Not cached: a failed request says nothing about membership
+        member = None
+    finally:
+        _fetching.pop(key, None)
+        if not fut.done():
+            fut.set_result(member)
+    if ttl is None:
+        return None
+    _fetched[key] = (now + ttl, member)
+    _fetched.move_to_end(key)
+    while len(_fetched) > MAX_FETCHED:
+        _fetched.popitem(last=False)
+    return member
+
+_owners = {}   # (guild_id, owner_id): Member
+
+async def resolve_owner(guild):
+    """The guild owner, fetched once when the member cache does not hold them."""
+    if guild.owner is not None:
+        return guild.owner
+    key = (guild.id, guild.owner_id)
+    owner = _owners.get(key)
+    if owner is None and guild.owner_id:
+        owner = await resolve_member(guild, guild.owner_id)
+        if owner is not None:
+            _owners[key] = owner
+    return owner
@@ -0,0 +1,53 @@
+import time
+from collections import deque
+
+class GhostPing:
+    __slots__ = ("author_id", "channel_id", "sent")
+
+    def __init__(self, author_id, channel_id, sent):
+        self.author_id = author_id
+        self.channel_id = channel_id
+        self.sent = sent
+
+class GhostPingIndex:
+    """Recent messages with mentions, expired in time buckets.
+
+    Only messages sent within the last ``window`` seconds are kept. Expiry
+    drops whole buckets of ``bucket`` seconds at a time, so tracking and
+    lookups stay O(1) amortized and the index never outgrows the window.
+    """
+
+    def __init__(self, window=30.0, bucket=5.0):
+        self.window = window
+        self.bucket = bucket
+        self._entries = {}         # message_id: GhostPing
+        self._buckets = deque()    # (bucket_start, [message_id, ...])
+
+    def track(self, message_id, author_id, channel_id):
+        now = time.monotonic()
+        self._expire(now)
+        start = now - (now % self.bucket)
+        if not self._buckets or self._buckets[-1][0] != start:
+            self._buckets.append((start, []))
+        self._buckets[-1][1].append(message_id)
+        self._entries[message_id] = GhostPing(author_id, channel_id, now)
+
+    def pop(self, message_id):
+        """Remove and return the entry if it is still inside the window."""
+        now = time.monotonic()
+        self._expire(now)
+        entry = self._entries.pop(message_id, None)
+        if entry is not None and now - entry.sent < self.window:
+            return entry
+        return None
+
+    def _expire(self, now):
+        # A bucket is dropped once its newest possible entry is out of the window
+        buckets = self._buckets
+        while buckets and now - (buckets[0][0] + self.bucket) >= self.window:
+            _, message_ids = buckets.popleft()
+            for message_id in message_ids:
+                self._entries.pop(message_id, None)
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,107 @@
+import asyncio
+import os
+import re
+from array import array
+from bisect import bisect_left
+
+BLOCKLIST_PATH = os.environ.get("SECUREAURA_LINK_BLOCKLIST", "link_blocklist.txt")
+
+# Discord only makes scheme and www. links clickable; the host ends at the path, port or query
+LINK_RE = re.compile(r"(?:https?://|\bwww\.)(?:[^\s/@<>]*@)?([^\s/:?#<>|\\)\]]+)", re.IGNORECASE)
+WILDCARD = "*"
+
+def extract_hosts(content):
+    """Lowercased hosts of the clickable links in ``content``, in order, without duplicates."""
+    if not content or ("://" not in content and "www." not in content.lower()):
+        return []
+    hosts = []
+    for host in LINK_RE.findall(content):
+        host = host.lower().rstrip(".")
+        if host.startswith("www."):
+            host = host[4:]
+        if host and host not in hosts:
+            hosts.append(host)
+    return hosts
+
+def suffixes(host):
+    """``a.b.c`` -> ``a.b.c``, ``b.c``, ``c``."""
+    yield host
+    dot = host.find(".")
+    while dot != -1:
+        yield host[dot + 1:]
+        dot = host.find(".", dot + 1)
+
+def normalize_domain(domain):
+    domain = domain.strip().lower()
+    if domain == WILDCARD:
+        return domain
+    hosts = extract_hosts(domain if "://" in domain else f"https://{domain}")
+    return hosts[0] if hosts else None
+
+def match_domain(host, domains):
+    """The entry of the small set ``domains`` covering ``host`` (itself or a parent), else None."""
+    if not domains:
+        return None
+    for suffix in suffixes(host):
+        if suffix in domains:
+            return suffix
+    return WILDCARD if WILDCARD in domains else None
+
+class DomainBlocklist:
+    """Large domain blocklist stored as a sorted array of suffix hashes.
+
+    Each domain costs 8 bytes instead of a Python string, and a host is
+    checked by hashing each of its suffixes and binary-searching for it,
+    so lookups take microseconds whatever the size of the list. Loading
+    parses the file in a worker thread and swaps the array in at once.
+    """
+
+    def __init__(self, path=BLOCKLIST_PATH):
+        self.path = path
+        self._hashes = array("q")
+        self._lock = None
+
+    def __len__(self):
+        return len(self._hashes)
+
+    def _contains(self, value):
+        hashes = self._hashes
+        i = bisect_left(hashes, value)
+        return i < len(hashes) and hashes[i] == value
+
+    def match(self, host):
+        """The blocked domain covering ``host``, else None."""
+        if not self._hashes:
+            return None
+        for suffix in suffixes(host):
+            if self._contains(hash(suffix)):
+                return suffix
+        return None
+
+    def _read(self):
+        hashes = set()
+        with open(self.path, "r", encoding="utf-8", errors="ignore") as f:
+            for line in f:
+                # Plain domains or hosts-file lines ("0.0.0.0 evil.example")
+                line = line.split("#", 1)[0].split()
+                if not line:
+                    continue
+                domain = line[-1].lower().rstrip(".")
+                if domain.startswith("*."):
+                    domain = domain[2:]
+                if "." in domain:
+                    hashes.add(hash(domain))
+        return array("q", sorted(hashes))
+
+    async def reload(self):
+        """Re-read the blocklist file off the event loop; returns the number of domains."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if not os.path.exists(self.path):
+                self._hashes = array("q")
+                return 0
+            self._hashes = await asyncio.to_thread(self._read)
+            return len(self._hashes)
+
+blocklist = DomainBlocklist()
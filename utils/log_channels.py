@@ -0,0 +1,77 @@
+import asyncio
+import discord
+
+_MISSING = object()
+
+class LogChannelResolver:
+    """Per-guild cache of log destinations looked up by channel name.
+
+    Lookups are O(1) after the first scan of a guild's text channels, misses
+    are cached too, and channel create/update/delete events drop the guild's
+    entries. ``get_or_create`` is single-flight per guild and name, so a
+    burst of alerts creates at most one channel.
+    """
+
+    def __init__(self):
+        self._cache = {}   # guild_id: {name: channel_id or None}
+        self._locks = {}   # (guild_id, name): asyncio.Lock
+
+    def get(self, guild, name):
+        entries = self._cache.setdefault(guild.id, {})
+        channel_id = entries.get(name, _MISSING)
+        if channel_id is None:
+            return None
+        if channel_id is not _MISSING:
+            channel = guild.get_channel(channel_id)
+            if channel is not None:
+                return channel
+        channel = discord.utils.get(guild.text_channels, name=name)
+        entries[name] = channel.id if channel else None
+        return channel
+
+    def set(self, guild_id, name, channel):
+        self._cache.setdefault(guild_id, {})[name] = channel.id if channel else None
+
+    async def get_or_create(self, guild, name, create):
+        """Return the ``name`` channel, awaiting ``create(guild)`` once if it is missing.
+
+        ``create`` may return some other channel as a fallback; only a
+        channel actually called ``name`` is cached.
+        """
+        channel = self.get(guild, name)
+        if channel:
+            return channel
+        lock = self._locks.setdefault((guild.id, name), asyncio.Lock())
+        async with lock:
+            channel = self.get(guild, name)
+            if channel:
+                return channel
+            channel = await create(guild)
+            # A fallback channel under another name is returned uncached, so creation is retried
+            if channel and channel.name == name:
+                self.set(guild.id, name, channel)
+            return channel
+
+    def invalidate(self, guild_id):
+        self._cache.pop(guild_id, None)
+
+def get_log_channels(bot):
+    """Return the bot-wide log channel resolver, wiring its invalidation on first use."""
+    resolver = getattr(bot, "log_channel_resolver", None)
+    if resolver is None:
+        resolver = bot.log_channel_resolver = LogChannelResolver()
+
+        async def on_guild_channel_create(channel):
+            resolver.invalidate(channel.guild.id)
+
+        async def on_guild_channel_delete(channel):
+            resolver.invalidate(channel.guild.id)
+
+        async def on_guild_channel_update(before, after):
+            if before.name != after.name:
+                resolver.invalidate(after.guild.id)
+
+        bot.add_listener(on_guild_channel_create)
+        bot.add_listener(on_guild_channel_delete)
+        bot.add_listener(on_guild_channel_update)
+    return resolver
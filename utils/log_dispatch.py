@@ -0,0 +1,99 @@
+import asyncio
+from collections import OrderedDict
+from utils.punish import get_punisher
+
+MAX_EMBEDS = 10          # Discord's per-message embed limit
+MAX_EMBED_CHARS = 5500   # stay under the 6000 character total per message
+
+class _Batch:
+    __slots__ = ("guild", "destination", "fallback", "embeds", "mentions", "chars")
+
+    def __init__(self, guild, destination, fallback):
+        self.guild = guild
+        self.destination = destination
+        self.fallback = fallback
+        self.embeds = OrderedDict()   # (title, description): [embed, count]
+        self.mentions = OrderedDict()
+        self.chars = 0
+
+class LogDispatcher:
+    """Buffers security alerts per destination and sends them in batches.
+
+    Alerts for one channel (or owner DM) are collected for ``interval``
+    seconds, or until a message is full, and then sent as a single message
+    with up to 10 embeds. Alerts with the same title and description
+    collapse into the latest of them, marked "×N". Batches go through the punishment executor at log priority, so
+    bans queued in the same guild go first, although a send already in
+    flight holds that guild's worker until it finishes.
+    """
+
+    def __init__(self, bot, interval=2.0):
+        self.bot = bot
+        self.interval = interval
+        self._batches = {}   # destination id: _Batch
+        self._timers = {}
+        self._sending = set()   # strong refs so in-flight sends are not garbage collected
+
+    def post(self, guild, destination, embed, content=None, fallback=None):
+        """Queue ``embed`` for ``destination``; ``fallback`` is used if sending fails."""
+        key = destination.id
+        batch = self._batches.get(key)
+        size = len(embed)
+        if batch is not None and (key, embed.title, embed.description) not in batch.embeds and batch.chars + size > MAX_EMBED_CHARS:
+            self._flush_now(key)
+            batch = None
+        if batch is None:
+            batch = self._batches[key] = _Batch(guild, destination, fallback)
+
+        sig = (key, embed.title, embed.description)
+        if sig in batch.embeds:
+            # Keep the latest copy so fields such as "Count 3/3" stay current
+            kept = batch.embeds[sig]
+            batch.chars += size - len(kept[0])
+            kept[0] = embed
+            kept[1] += 1
+        else:
+            batch.embeds[sig] = [embed, 1]
+            batch.chars += size
+        if content:
+            batch.mentions[content] = None
+
+        if len(batch.embeds) >= MAX_EMBEDS:
+            self._flush_now(key)
+        elif key not in self._timers:
+            self._timers[key] = asyncio.get_running_loop().call_later(self.interval, self._flush_now, key)
+
+    def pending_count(self):
+        return sum(len(batch.embeds) for batch in self._batches.values())
+
+    def _flush_now(self, key):
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._batches.pop(key, None)
+        if batch is not None:
+            task = asyncio.ensure_future(self._send(batch))
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+
+    async def _send(self, batch):
+        embeds = []
+        for embed, count in batch.embeds.values():
+            if count > 1:
+                embed.title = f"{embed.title or 'Alert'} ×{count}"
+            embeds.append(embed)
+        content = " ".join(batch.mentions)[:2000] or None
+        try:
+            await get_punisher(self.bot).submit(batch.guild, "send", batch.destination, embeds=embeds, content=content)
+        except Exception:
+            if batch.fallback is None or batch.fallback.id == batch.destination.id:
+                return
+            for embed in embeds:
+                self.post(batch.guild, batch.fallback, embed, content)
+
+def get_log_dispatcher(bot):
+    """Return the bot-wide log dispatcher, creating it on first use."""
+    dispatcher = getattr(bot, "log_dispatcher", None)
+    if dispatcher is None:
+        dispatcher = bot.log_dispatcher = LogDispatcher(bot)
+    return dispatcher
@@ -0,0 +1,203 @@
+import asyncio
+import logging
+import os
+import re
+import time
+from collections import defaultdict
+
+# Seconds; covers fast in-memory handlers up to slow REST round trips
+BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+METRICS_HOST = os.environ.get("SECUREAURA_METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.environ["SECUREAURA_METRICS_PORT"]) if os.environ.get("SECUREAURA_METRICS_PORT") else None
+
+class Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.total += value
+        self.count += 1
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+def _labels(labels):
+    if not labels:
+        return ""
+    inner = ",".join(f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"' for k, v in labels)
+    return "{" + inner + "}"
+
+class Metrics:
+    """In-process counters and histograms rendered in Prometheus text format.
+
+    Series are keyed by (name, labels) where labels is a tuple of
+    (key, value) pairs. Gauges are computed by callbacks at scrape time.
+    """
+
+    def __init__(self):
+        self.counters = defaultdict(float)
+        self.histograms = defaultdict(Histogram)
+        self.help = {}
+        self.gauges = []   # callables returning [(name, labels, value)]
+
+    def inc(self, name, labels=(), value=1):
+        self.counters[(name, labels)] += value
+
+    def observe(self, name, labels, value):
+        self.histograms[(name, labels)].observe(value)
+
+    def describe(self, name, text):
+        self.help[name] = text
+
+    def render(self):
+        lines = []
+        seen = set()
+
+        def header(name, kind):
+            if name not in seen:
+                seen.add(name)
+                if name in self.help:
+                    lines.append(f"# HELP {name} {self.help[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in sorted(self.counters.items()):
+            header(name, "counter")
+            lines.append(f"{name}{_labels(labels)} {value}")
+        for (name, labels), hist in sorted(self.histograms.items(), key=lambda i: i[0]):
+            header(name, "histogram")
+            cumulative = 0
+            for bound, count in zip(BUCKETS, hist.counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(labels + (('le', bound),))} {cumulative}")
+            lines.append(f"{name}_bucket{_labels(labels + (('le', '+Inf'),))} {hist.count}")
+            lines.append(f"{name}_sum{_labels(labels)} {hist.total}")
+            lines.append(f"{name}_count{_labels(labels)} {hist.count}")
+        for gauge in self.gauges:
+            try:
+                samples = gauge()
+            except Exception:
+                continue
+            for name, labels, value in samples:
+                header(name, "gauge")
+                lines.append(f"{name}{_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+class _RateLimitHandler(logging.Handler):
+    """Turns discord.http's 429 warnings into metrics.
+
+    A global 429 logs the route warning and then a "Global rate limit"
+    one in the same step, so the hit is recorded on the next loop
+    iteration, once, under the scope it turned out to have. Pre-emptive
+    waits on an exhausted bucket are not logged by discord.py and are not
+    counted; they show up in ``secureaura_rest_request_seconds`` instead.
+    """
+    HIT_RE = re.compile(r"responded with 429\. Retrying in ([\d.]+) seconds")
+
+    def __init__(self, metrics):
+        super().__init__(logging.WARNING)
+        self.metrics = metrics
+        self._pending = None   # [scope, retry_after] of the 429 being classified
+
+    def emit(self, record):
+        message = record.getMessage()
+        if message.startswith("Global rate limit"):
+            if self._pending is not None:
+                self._pending[0] = "global"
+            return
+        match = self.HIT_RE.search(message)
+        if not match:
+            return
+        self._record()
+        self._pending = ["route", float(match.group(1))]
+        try:
+            asyncio.get_running_loop().call_soon(self._record)
+        except RuntimeError:
+            self._record()
+
+    def _record(self):
+        if self._pending is None:
+            return
+        (scope, retry_after), self._pending = self._pending, None
+        self.metrics.inc("secureaura_ratelimit_hits_total", (("scope", scope),))
+        self.metrics.inc("secureaura_ratelimit_wait_seconds_total", (("scope", scope),), retry_after)
+
+def _instrument_http(bot, metrics):
+    http = bot.http
+    original = http.request
+
+    async def request(route, **kwargs):
+        labels = (("method", route.method), ("route", route.path))
+        start = time.perf_counter()
+        status = "ok"
+        try:
+            return await original(route, **kwargs)
+        except Exception as e:
+            status = str(getattr(e, "status", type(e).__name__))
+            raise
+        finally:
+            metrics.inc("secureaura_rest_requests_total", labels + (("status", status),))
+            metrics.observe("secureaura_rest_request_seconds", labels, time.perf_counter() - start)
+
+    http.request = request
+
+def _bot_gauges(bot):
+    samples = []
+    latencies = getattr(bot, "latencies", None) or [(0, bot.latency)]
+    for shard_id, latency in latencies:
+        if latency == latency and latency != float("inf"):   # skip NaN/inf before the first heartbeat
+            samples.append(("secureaura_gateway_latency_seconds", (("shard", shard_id),), latency))
+    samples.append(("secureaura_guilds", (), len(bot.guilds)))
+    punisher = getattr(bot, "punisher", None)
+    if punisher is not None:
+        samples.append(("secureaura_punish_queue_depth", (), punisher.pending_count()))
+    dispatcher = getattr(bot, "log_dispatcher", None)
+    if dispatcher is not None:
+        samples.append(("secureaura_log_batch_pending", (), dispatcher.pending_count()))
+    return samples
+
+def install(bot):
+    """Enable metrics for ``bot``: listener timings, REST counters, rate limits."""
+    metrics = bot.metrics = Metrics()
+    metrics.describe("secureaura_listener_seconds", "Time spent in each event listener")
+    metrics.describe("secureaura_rest_requests_total", "REST requests by route and outcome")
+    metrics.describe("secureaura_rest_request_seconds", "REST request latency including rate limit waits")
+    metrics.describe("secureaura_ratelimit_hits_total", "429 responses from Discord")
+    metrics.describe("secureaura_ratelimit_wait_seconds_total", "Seconds spent waiting after 429 responses")
+    _instrument_http(bot, metrics)
+    logging.getLogger("discord.http").addHandler(_RateLimitHandler(metrics))
+    metrics.gauges.append(lambda: _bot_gauges(bot))
+    return metrics
+
+async def serve(metrics, host=METRICS_HOST, port=METRICS_PORT):
+    """Serve ``GET /metrics`` on a minimal HTTP server."""
+    async def handle(reader, writer):
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+            while (await asyncio.wait_for(reader.readline(), timeout=5)) not in (b"\r\n", b"\n", b""):
+                pass
+            parts = request_line.decode("latin-1").split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+                body = metrics.render().encode()
+                status = "200 OK"
+            else:
+                body = b"not found\n"
+                status = "404 Not Found"
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+        except Exception:
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    print(f"Metrics available on http://{host}:{port}/metrics")
+    return server
@@ -0,0 +1,94 @@
+import time
+from collections import OrderedDict, deque
+
+# action: (max actions, window seconds) before the actor is banned
+DEFAULT_NUKE_LIMITS = {
+    "channel": (3, 30),
+    "role": (3, 30),
+    "ban": (3, 30),
+    "kick": (3, 30),
+    "webhook": (3, 30),
+    "emoji": (3, 30),
+}
+
+class NukeDetector:
+    """Counts destructive actions per (guild, actor, action) in a sliding window.
+
+    Each key keeps at most ``limit`` monotonic timestamps, so an update is
+    O(1) amortized and old actions simply fall out of the window instead of
+    accumulating forever. Keys untouched for ``idle_ttl`` seconds are
+    evicted and the table is capped at ``max_entries``.
+    """
+
+    def __init__(self, limits=None, overrides=None, idle_ttl=600.0, max_entries=100_000):
+        self.limits = dict(limits or DEFAULT_NUKE_LIMITS)
+        self.idle_ttl = idle_ttl
+        self.max_entries = max_entries
+        # guild_id: {action: (max actions, window)}; may be shared between detectors
+        self.overrides = {} if overrides is None else overrides
+        self._windows = OrderedDict()
+
+    def limit(self, guild_id, action):
+        overrides = self.overrides.get(guild_id)
+        if overrides and action in overrides:
+            return overrides[action]
+        return self.limits[action]
+
+    def set_limit(self, guild_id, action, max_actions, window):
+        self.overrides.setdefault(guild_id, {})[action] = (max_actions, window)
+
+    def load_limits(self, data):
+        self.overrides.clear()
+        self.overrides.update({
+            int(gid): {action: tuple(limit) for action, limit in limits.items() if action in self.limits}
+            for gid, limits in data.items()
+        })
+
+    def apply_limits(self, guild_id, value):
+        """Apply one stored row of overrides (None when it was deleted)."""
+        if value is None:
+            self.overrides.pop(int(guild_id), None)
+        else:
+            self.overrides[int(guild_id)] = {action: tuple(limit) for action, limit in value.items() if action in self.limits}
+
+    def dump_limits(self, guild_id):
+        overrides = self.overrides.get(guild_id)
+        return {action: list(limit) for action, limit in overrides.items()} if overrides else None
+
+    def dump_all_limits(self):
+        return {str(gid): self.dump_limits(gid) for gid in self.overrides if self.overrides[gid]}
+
+    def hit(self, guild_id, actor_id, action):
+        """Record one action; return (count in window, max actions)."""
+        max_actions, window = self.limit(guild_id, action)
+        now = time.monotonic()
+        key = (guild_id, actor_id, action)
+        ring = self._windows.get(key)
+        if ring is None or ring.maxlen != max_actions:
+            ring = deque(ring or (), maxlen=max_actions)
+            self._windows[key] = ring
+        else:
+            self._windows.move_to_end(key)
+        while ring and now - ring[0] >= window:
+            ring.popleft()
+        ring.append(now)
+        self._evict(now)
+        return len(ring), max_actions
+
+    def reset(self, guild_id, actor_id, action=None):
+        actions = [action] if action else self.limits
+        for a in actions:
+            self._windows.pop((guild_id, actor_id, a), None)
+
+    def _evict(self, now):
+        windows = self._windows
+        while len(windows) > self.max_entries:
+            windows.popitem(last=False)
+        while windows:
+            key, ring = next(iter(windows.items()))
+            if ring and now - ring[-1] < self.idle_ttl:
+                break
+            del windows[key]
+
+    def __len__(self):
+        return len(self._windows)
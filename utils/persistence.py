@@ -0,0 +1,106 @@
+import asyncio
+import atexit
+import json
+import os
+import tempfile
+from collections import defaultdict
+
+def atomic_write_json(path, data, dump_kwargs=None):
+    """Write JSON to a temp file next to ``path`` and rename it into place."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix=".tmp-", suffix=".json", dir=directory)
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, **(dump_kwargs or {}))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+class Persistence:
+    """Write-behind JSON persistence shared by every cog.
+
+    ``schedule`` only records a snapshot producer; the write happens
+    ``delay`` seconds later on a worker thread, so bursts of changes to one
+    file collapse into a single atomic write. ``flush`` drains everything
+    and is awaited on shutdown.
+    """
+
+    def __init__(self, delay=0.5):
+        self.delay = delay
+        self._pending = {}   # path: (producer, dump_kwargs)
+        self._timers = {}
+        self._locks = defaultdict(asyncio.Lock)
+        self._tasks = set()
+
+    def schedule(self, path, producer, **dump_kwargs):
+        """Queue ``producer()`` to be written to ``path``.
+
+        ``producer`` runs on the event loop right before the write and must
+        return a snapshot that is safe to serialize from another thread.
+        """
+        self._pending[path] = (producer, dump_kwargs)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._write_now(path)
+            return
+        if path not in self._timers:
+            self._timers[path] = loop.call_later(self.delay, self._start_flush, path)
+
+    def load(self, path, default=None):
+        """Read ``path``, preferring a snapshot that has not been written yet."""
+        pending = self._pending.get(path)
+        if pending is not None:
+            return pending[0]()
+        if not os.path.exists(path):
+            return default
+        with open(path, "r") as f:
+            return json.load(f)
+
+    def _start_flush(self, path):
+        self._timers.pop(path, None)
+        task = asyncio.ensure_future(self._flush_path(path))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _flush_path(self, path):
+        async with self._locks[path]:
+            pending = self._pending.pop(path, None)
+            if pending is None:
+                return
+            producer, dump_kwargs = pending
+            try:
+                await asyncio.to_thread(atomic_write_json, path, producer(), dump_kwargs)
+            except Exception as e:
+                print(f"Error saving {path}: {e}")
+
+    def _write_now(self, path):
+        pending = self._pending.pop(path, None)
+        if pending is not None:
+            producer, dump_kwargs = pending
+            atomic_write_json(path, producer(), dump_kwargs)
+
+    async def flush(self):
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        for path in list(self._pending):
+            await self._flush_path(path)
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def flush_sync(self):
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        for path in list(self._pending):
+            self._write_now(path)
+
+persistence = Persistence()
+atexit.register(persistence.flush_sync)
@@ -0,0 +1,159 @@
+import asyncio
+import contextvars
+import cProfile
+import functools
+import io
+import os
+import pstats
+import time
+import tracemalloc
+from collections import deque
+from datetime import datetime
+
+SLOW_LISTENER_MS = float(os.environ.get("SECUREAURA_SLOW_LISTENER_MS", "250"))
+PROFILE_DIR = os.environ.get("SECUREAURA_PROFILE_DIR", "profiles")
+PHASES = ("actor", "decision", "punish", "log")
+
+# Incident of the listener currently running in this task, if it is profiled
+_incident = contextvars.ContextVar("incident", default=None)
+
+class Incident:
+    __slots__ = ("listener", "guild_id", "started", "phases")
+
+    def __init__(self, listener, guild_id):
+        self.listener = listener
+        self.guild_id = guild_id
+        self.started = time.perf_counter()
+        self.phases = {}
+
+    def describe(self, total):
+        parts = ", ".join(f"{name} {self.phases[name] * 1000:.1f} ms" for name in PHASES if name in self.phases)
+        where = f" guild {self.guild_id}" if self.guild_id else ""
+        return f"{self.listener}{where}: {total * 1000:.1f} ms" + (f" ({parts})" if parts else "")
+
+class _Phase:
+    __slots__ = ("name", "incident", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.incident = _incident.get()
+        if self.incident is not None:
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if self.incident is not None:
+            phases = self.incident.phases
+            phases[self.name] = phases.get(self.name, 0.0) + time.perf_counter() - self.start
+        return False
+
+def phase(name):
+    """Attribute the time spent in the ``with`` block to ``name`` for the current incident."""
+    return _Phase(name)
+
+def _guild_id(args):
+    for arg in args[:2]:
+        guild_id = getattr(arg, "guild_id", None)
+        if guild_id is None:
+            guild_id = getattr(getattr(arg, "guild", None), "id", None)
+        if guild_id is not None:
+            return guild_id
+    return None
+
+class ListenerProfiler:
+    """Times every wrapped cog listener and keeps the slow ones.
+
+    Each listener run is an incident; ``phase()`` blocks inside it add
+    up per phase. Runs slower than ``threshold_ms`` are printed with their
+    phase breakdown and kept in ``slow``. ``capture`` turns on cProfile
+    or tracemalloc for a time window and writes the result to a file.
+    """
+
+    def __init__(self, threshold_ms=SLOW_LISTENER_MS, keep=50):
+        self.threshold = threshold_ms / 1000
+        self.slow = deque(maxlen=keep)   # (datetime, description)
+        self.capturing = None
+
+    def wrap(self, func):
+        name = func.__qualname__
+
+        @functools.wraps(func)
+        async def listener(*args, **kwargs):
+            incident = Incident(name, _guild_id(args[1:]))
+            token = _incident.set(incident)
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                _incident.reset(token)
+                total = time.perf_counter() - incident.started
+                if total >= self.threshold:
+                    self._report(incident, total)
+        return listener
+
+    def _report(self, incident, total):
+        description = incident.describe(total)
+        self.slow.append((datetime.utcnow(), description))
+        print(f"Slow listener {description}")
+
+    async def capture(self, mode, seconds, directory=PROFILE_DIR):
+        """Profile the whole event loop for ``seconds``; return the file written."""
+        if self.capturing:
+            raise RuntimeError(f"A {self.capturing} capture is already running")
+        if mode not in ("cpu", "memory"):
+            raise ValueError("mode must be 'cpu' or 'memory'")
+        os.makedirs(directory, exist_ok=True)
+        stamp = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+        self.capturing = mode
+        try:
+            if mode == "cpu":
+                return await self._capture_cpu(seconds, os.path.join(directory, f"cpu-{stamp}"))
+            return await self._capture_memory(seconds, os.path.join(directory, f"memory-{stamp}.txt"))
+        finally:
+            self.capturing = None
+
+    async def _capture_cpu(self, seconds, base):
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profile.disable()
+        profile.dump_stats(base + ".prof")
+        out = io.StringIO()
+        pstats.Stats(profile, stream=out).sort_stats("cumulative").print_stats(60)
+        await asyncio.to_thread(_write, base + ".txt", out.getvalue())
+        return base + ".txt"
+
+    async def _capture_memory(self, seconds, path, frames=10):
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start(frames)
+        try:
+            before = tracemalloc.take_snapshot()
+            await asyncio.sleep(seconds)
+            after = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            if started:
+                tracemalloc.stop()
+        lines = [f"Traced memory: current {current / 2**20:.1f} MiB, peak {peak / 2**20:.1f} MiB", "",
+                 "Top growth during the window:"]
+        lines += [str(stat) for stat in after.compare_to(before, "lineno")[:40]]
+        lines += ["", "Top allocations at the end of the window:"]
+        lines += [str(stat) for stat in after.statistics("lineno")[:40]]
+        await asyncio.to_thread(_write, path, "\n".join(lines) + "\n")
+        return path
+
+def _write(path, text):
+    with open(path, "w") as f:
+        f.write(text)
+
+profiler = ListenerProfiler()
+
+def profile_listeners(cls):
+    """Class decorator: time every ``commands.Cog.listener`` of a cog."""
+    for _, method_name in cls.__cog_listeners__:
+        setattr(cls, method_name, profiler.wrap(getattr(cls, method_name)))
+    return cls
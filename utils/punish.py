@@ -0,0 +1,185 @@
+import asyncio
+import heapq
+import itertools
+import time
+from datetime import timedelta
+import discord
+
+# Lower runs first within a guild's queue
+PRIORITY = {"ban": 0, "bulk_ban": 0, "kick": 1, "timeout": 2, "delete": 3, "send": 9}
+# Actions aimed at a single member, which are coalesced per user
+PER_MEMBER = {"ban", "kick", "timeout"}
+# Removing a member makes any pending lesser punishment for them pointless
+REMOVES_MEMBER = {"ban", "kick"}
+# Punishments a completed or pending action already covers: a ban covers a kick, not the reverse
+SATISFIES = {"ban": {"ban", "kick", "timeout"}, "kick": {"kick", "timeout"}, "timeout": {"timeout"}}
+
+class _Action:
+    __slots__ = ("kind", "target", "kwargs", "future", "cancelled")
+
+    def __init__(self, kind, target, kwargs, future):
+        self.kind = kind
+        self.target = target
+        self.kwargs = kwargs
+        self.future = future
+        self.cancelled = False
+
+class PunishmentExecutor:
+    """Central queue for bans, kicks, timeouts and their log messages.
+
+    Each guild gets its own priority queue drained by one worker, so calls
+    that share a Discord route bucket (bans in a guild, for example) never
+    race each other, while different guilds proceed concurrently up to
+    ``max_concurrency`` requests in flight. Duplicate actions against the
+    same user are coalesced onto a single request and members removed in
+    the last ``remember`` seconds are not punished again.
+    """
+
+    def __init__(self, max_concurrency=20, remember=60.0):
+        self._queues = {}     # guild_id: heap of (priority, seq, _Action)
+        self._workers = {}    # guild_id: asyncio.Task
+        self._pending = {}    # (guild_id, kind, user_id): _Action
+        self._removed = {}    # (guild_id, user_id): (kind, monotonic time) of the last ban/kick
+        self._seq = itertools.count()
+        self._max_concurrency = max_concurrency
+        self._semaphore = None
+        self.remember = remember
+
+    def submit(self, guild, kind, target, **kwargs):
+        """Queue an action and return a future for its result.
+
+        The future resolves to True on success or raises the error Discord
+        returned. ``target`` is a member/user for punishments, a list of
+        users for ``bulk_ban``, a message for ``delete`` and a messageable
+        for ``send``.
+        """
+        loop = asyncio.get_running_loop()
+        user_id = target.id if kind in PER_MEMBER else None
+
+        if user_id is not None:
+            removed = self._removed.get((guild.id, user_id))
+            if removed is not None and kind in SATISFIES[removed[0]] and time.monotonic() - removed[1] < self.remember:
+                fut = loop.create_future()
+                fut.set_result(True)
+                return fut
+            for other in PER_MEMBER:
+                pending = self._pending.get((guild.id, other, user_id))
+                if pending and kind in SATISFIES[other]:
+                    return pending.future
+
+        action = _Action(kind, target, kwargs, loop.create_future())
+        if user_id is not None:
+            self._pending[(guild.id, kind, user_id)] = action
+            if kind in REMOVES_MEMBER:
+                self._supersede(guild.id, user_id, action)
+
+        heapq.heappush(self._queues.setdefault(guild.id, []), (PRIORITY[kind], next(self._seq), action))
+        if guild.id not in self._workers:
+            self._workers[guild.id] = asyncio.create_task(self._drain(guild))
+        return action.future
+
+    def recently_removed(self, guild_id, user_id):
+        """True when a ban or kick of the user succeeded in the last ``remember`` seconds."""
+        removed = self._removed.get((guild_id, user_id))
+        return removed is not None and time.monotonic() - removed[1] < self.remember
+
+    def pending_count(self):
+        return sum(len(queue) for queue in self._queues.values())
+
+    async def ban(self, guild, user, **kwargs):
+        return await self.submit(guild, "ban", user, **kwargs)
+
+    async def kick(self, guild, user, **kwargs):
+        return await self.submit(guild, "kick", user, **kwargs)
+
+    async def timeout(self, guild, member, minutes, **kwargs):
+        return await self.submit(guild, "timeout", member, until=discord.utils.utcnow() + timedelta(minutes=minutes), **kwargs)
+
+    async def bulk_ban(self, guild, users, **kwargs):
+        return await self.submit(guild, "bulk_ban", list(users), **kwargs)
+
+    def _supersede(self, guild_id, user_id, action):
+        # A queued kick/timeout for someone about to be removed rides on the removal
+        for kind in PER_MEMBER:
+            pending = self._pending.get((guild_id, kind, user_id))
+            if pending is None or pending is action or kind not in SATISFIES[action.kind]:
+                continue
+            pending.cancelled = True
+            del self._pending[(guild_id, kind, user_id)]
+            _chain(action.future, pending.future)
+
+    async def _drain(self, guild):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._max_concurrency)
+        queue = self._queues[guild.id]
+        try:
+            while queue:
+                _, _, action = heapq.heappop(queue)
+                if action.cancelled:
+                    continue
+                async with self._semaphore:
+                    try:
+                        result = await self._run(guild, action)
+                    except Exception as e:
+                        self._finish(guild.id, action, error=e)
+                    else:
+                        self._finish(guild.id, action, result=result)
+        finally:
+            self._workers.pop(guild.id, None)
+            if not queue:
+                self._queues.pop(guild.id, None)
+
+    async def _run(self, guild, action):
+        kind, target, kwargs = action.kind, action.target, action.kwargs
+        if kind == "ban":
+            await guild.ban(target, **kwargs)
+        elif kind == "bulk_ban":
+            return await guild.bulk_ban(target, **kwargs)
+        elif kind == "kick":
+            await guild.kick(target, **kwargs)
+        elif kind == "timeout":
+            await target.timeout(kwargs.pop("until"), **kwargs)
+        elif kind == "delete":
+            await target.delete()
+        elif kind == "send":
+            return await target.send(**kwargs)
+        return True
+
+    def _finish(self, guild_id, action, result=None, error=None):
+        if action.kind in PER_MEMBER:
+            user_id = action.target.id
+            if self._pending.get((guild_id, action.kind, user_id)) is action:
+                del self._pending[(guild_id, action.kind, user_id)]
+            if error is None and action.kind in REMOVES_MEMBER:
+                self._remember(guild_id, user_id, action.kind)
+        if action.future.done():
+            return
+        if error is not None:
+            action.future.set_exception(error)
+        else:
+            action.future.set_result(result)
+
+    def _remember(self, guild_id, user_id, kind):
+        now = time.monotonic()
+        self._removed[(guild_id, user_id)] = (kind, now)
+        if len(self._removed) > 10_000:
+            self._removed = {k: v for k, v in self._removed.items() if now - v[1] < self.remember}
+
+def _chain(source, target):
+    def copy(fut):
+        if target.done():
+            return
+        if fut.cancelled():
+            target.cancel()
+        elif fut.exception() is not None:
+            target.set_exception(fut.exception())
+        else:
+            target.set_result(fut.result())
+    source.add_done_callback(copy)
+
+def get_punisher(bot):
+    """Return the bot-wide punishment executor, creating it on first use."""
+    punisher = getattr(bot, "punisher", None)
+    if punisher is None:
+        punisher = bot.punisher = PunishmentExecutor()
+    return punisher
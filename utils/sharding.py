@@ -0,0 +1,81 @@
+import time
+from collections import Counter, defaultdict
+from discord.ext import commands
+
+def shard_for(bot, guild_id):
+    """Shard id that owns ``guild_id`` (0 when the bot is not sharded)."""
+    return (guild_id >> 22) % (bot.shard_count or 1)
+
+def owns_guild(bot, guild_id):
+    """Whether ``guild_id`` belongs to one of the shards this process runs."""
+    shard_ids = getattr(bot, "shard_ids", None)
+    return shard_ids is None or shard_for(bot, guild_id) in shard_ids
+
+class ShardPartition:
+    """Per-shard instances of some per-guild state container.
+
+    ``get(guild_id)`` returns the container for the guild's shard, so state
+    for different shards never shares a dict and each shard's state can be
+    measured on its own. Unsharded bots use a single partition.
+    """
+
+    def __init__(self, bot, factory):
+        self.bot = bot
+        self.factory = factory
+        self._parts = {}
+
+    def get(self, guild_id):
+        shard_id = shard_for(self.bot, guild_id)
+        part = self._parts.get(shard_id)
+        if part is None:
+            part = self._parts[shard_id] = self.factory()
+        return part
+
+    def sizes(self):
+        return {shard_id: len(part) for shard_id, part in self._parts.items()}
+
+def _guild_id_of(args):
+    if not args:
+        return None
+    first = args[0]
+    guild_id = getattr(first, "guild_id", None)
+    if guild_id is None:
+        guild = getattr(first, "guild", None)
+        guild_id = getattr(guild, "id", None)
+    if guild_id is None and type(first).__name__ == "Guild":
+        guild_id = first.id
+    return guild_id
+
+class ShardStatsMixin:
+    """Counts dispatched events per shard, keyed by the event's guild.
+
+    When metrics are installed (``bot.metrics``) every listener run is also
+    timed and recorded under its qualified name.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.shard_event_counts = defaultdict(Counter)
+        self.metrics = None
+
+    async def _run_event(self, coro, event_name, *args, **kwargs):
+        if self.metrics is None:
+            return await super()._run_event(coro, event_name, *args, **kwargs)
+        start = time.perf_counter()
+        try:
+            await super()._run_event(coro, event_name, *args, **kwargs)
+        finally:
+            listener = getattr(coro, "__qualname__", event_name)
+            self.metrics.observe("secureaura_listener_seconds", (("listener", listener),), time.perf_counter() - start)
+
+    def dispatch(self, event_name, /, *args, **kwargs):
+        guild_id = _guild_id_of(args)
+        shard_id = shard_for(self, guild_id) if guild_id else None
+        self.shard_event_counts[shard_id][event_name] += 1
+        super().dispatch(event_name, *args, **kwargs)
+
+class SecureAuraBot(ShardStatsMixin, commands.Bot):
+    pass
+
+class ShardedSecureAuraBot(ShardStatsMixin, commands.AutoShardedBot):
+    pass
@@ -0,0 +1,409 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import discord
+
+SNAPSHOT_DB = os.environ.get("SECUREAURA_SNAPSHOT_DB", "snapshots.db")
+SNAPSHOT_INTERVAL = 10   # seconds of events folded into one incremental snapshot
+FULL_EVERY = 100         # incremental snapshots before the next full one
+KEEP_FULL = 10           # full snapshots (and their increments) kept per guild
+COLLECT_INTERVAL = 6 * 3600   # seconds between sweeps for blobs no snapshot references
+KINDS = ("roles", "channels")
+
+# ------------ RECORDS ------------
+def role_record(role):
+    return {
+        "name": role.name,
+        "permissions": role.permissions.value,
+        "color": role.color.value,
+        "hoist": role.hoist,
+        "mentionable": role.mentionable,
+        "position": role.position,
+        "managed": role.managed,
+    }
+
+def _overwrite_type(target):
+    if isinstance(target, discord.Role) or getattr(target, "type", None) is discord.Role:
+        return "role"
+    return "member"
+
+def channel_record(channel):
+    record = {
+        "name": channel.name,
+        "type": str(channel.type),
+        "position": channel.position,
+        "category_id": channel.category_id,
+        "overwrites": sorted(
+            [target.id, _overwrite_type(target), *(p.value for p in overwrite.pair())]
+            for target, overwrite in channel.overwrites.items()
+        ),
+    }
+    for attr in ("topic", "nsfw", "slowmode_delay", "bitrate", "user_limit"):
+        value = getattr(channel, attr, None)
+        if value is not None:
+            record[attr] = value
+    return record
+
+RECORDERS = {"roles": role_record, "channels": channel_record}
+
+def encode(record):
+    """(content hash, canonical JSON) of a record; equal records share a hash."""
+    data = json.dumps(record, sort_keys=True, separators=(",", ":")).encode()
+    return hashlib.blake2b(data, digest_size=16).hexdigest(), data
+
+def capture(guild):
+    """Full structure of a guild as {kind: {object id: record}}."""
+    return {
+        "roles": {str(r.id): role_record(r) for r in guild.roles},
+        "channels": {str(c.id): channel_record(c) for c in guild.channels},
+    }
+
+# ------------ STORE ------------
+class SnapshotStore:
+    """Compressed, deduplicated snapshot storage in SQLite.
+
+    Every role or channel record is stored once as a zlib blob keyed by its
+    content hash, shared by all snapshots and guilds that contain it. A
+    snapshot row is a compressed manifest: full snapshots map every object
+    id to a hash, incremental ones only hold the ids set or deleted since
+    the previous row. Statements run on one worker thread.
+    """
+
+    def __init__(self, path=SNAPSHOT_DB):
+        self.path = path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="snapshots")
+        self._local = threading.local()
+        self._schema_ready = False
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        if not self._schema_ready:
+            with conn:
+                conn.execute("CREATE TABLE IF NOT EXISTS blobs (hash TEXT PRIMARY KEY, data BLOB NOT NULL) WITHOUT ROWID")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS snapshots (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                    "guild_id INTEGER NOT NULL, ts REAL NOT NULL, full INTEGER NOT NULL, "
+                    "changes INTEGER NOT NULL, body BLOB NOT NULL)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS snapshots_guild ON snapshots (guild_id, id)")
+            self._schema_ready = True
+        return conn
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def write(self, guild_id, full, body, changes, blobs):
+        """Store a snapshot row plus any new record blobs; return the snapshot id."""
+        return await self._run(self._write, guild_id, full, body, changes, blobs)
+
+    def _write(self, guild_id, full, body, changes, blobs):
+        conn = self._conn()
+        with conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO blobs (hash, data) VALUES (?, ?)",
+                [(h, zlib.compress(data)) for h, data in blobs.items()]
+            )
+            cur = conn.execute(
+                "INSERT INTO snapshots (guild_id, ts, full, changes, body) VALUES (?, ?, ?, ?, ?)",
+                (guild_id, time.time(), int(full), changes, zlib.compress(json.dumps(body, separators=(",", ":")).encode()))
+            )
+            if full:
+                self._prune(conn, guild_id)
+        return cur.lastrowid
+
+    def _prune(self, conn, guild_id):
+        # Blobs are shared across guilds, so ``collect`` sweeps them separately
+        row = conn.execute(
+            "SELECT id FROM snapshots WHERE guild_id = ? AND full = 1 ORDER BY id DESC LIMIT 1 OFFSET ?",
+            (guild_id, KEEP_FULL - 1)
+        ).fetchone()
+        if row:
+            conn.execute("DELETE FROM snapshots WHERE guild_id = ? AND id < ?", (guild_id, row[0]))
+
+    async def collect(self, keep=()):
+        """Delete blobs referenced by no snapshot and not in ``keep``; return how many."""
+        return await self._run(self._collect, set(keep))
+
+    def _collect(self, keep):
+        conn = self._conn()
+        live = set(keep)
+        for full, body in conn.execute("SELECT full, body FROM snapshots"):
+            data = json.loads(zlib.decompress(body))
+            for items in (data if full else data.get("set", {})).values():
+                live.update(items.values())
+        dead = [(h,) for (h,) in conn.execute("SELECT hash FROM blobs") if h not in live]
+        with conn:
+            conn.executemany("DELETE FROM blobs WHERE hash = ?", dead)
+        return len(dead)
+
+    async def state(self, guild_id, upto=None):
+        """(state, increments since the last full snapshot, snapshot id) as of ``upto``."""
+        return await self._run(self._state, guild_id, upto)
+
+    def _state(self, guild_id, upto):
+        conn = self._conn()
+        upto = upto if upto is not None else 2 ** 62
+        base = conn.execute(
+            "SELECT id FROM snapshots WHERE guild_id = ? AND full = 1 AND id <= ? ORDER BY id DESC LIMIT 1",
+            (guild_id, upto)
+        ).fetchone()
+        if base is None:
+            return None, 0, None
+        rows = conn.execute(
+            "SELECT id, full, body FROM snapshots WHERE guild_id = ? AND id >= ? AND id <= ? ORDER BY id",
+            (guild_id, base[0], upto)
+        ).fetchall()
+        state = None
+        for _, full, body in rows:
+            data = json.loads(zlib.decompress(body))
+            if full:
+                state = {kind: dict(data.get(kind, {})) for kind in KINDS}
+            elif state is not None:
+                apply_diff(state, data)
+        return state, len(rows) - 1, rows[-1][0]
+
+    async def records(self, hashes):
+        return await self._run(self._records, list(hashes))
+
+    def _records(self, hashes):
+        conn = self._conn()
+        found = {}
+        for i in range(0, len(hashes), 500):
+            chunk = hashes[i:i + 500]
+            rows = conn.execute(f"SELECT hash, data FROM blobs WHERE hash IN ({','.join('?' * len(chunk))})", chunk)
+            found.update((h, json.loads(zlib.decompress(data))) for h, data in rows)
+        return found
+
+    async def history(self, guild_id, limit=15):
+        return await self._run(self._history, guild_id, limit)
+
+    def _history(self, guild_id, limit):
+        return self._conn().execute(
+            "SELECT id, ts, full, changes FROM snapshots WHERE guild_id = ? ORDER BY id DESC LIMIT ?",
+            (guild_id, limit)
+        ).fetchall()
+
+def apply_diff(state, diff):
+    for kind, items in diff.get("set", {}).items():
+        state[kind].update(items)
+    for kind, ids in diff.get("del", {}).items():
+        for object_id in ids:
+            state[kind].pop(object_id, None)
+
+def diff_states(old, new):
+    diff = {"set": {}, "del": {}}
+    for kind in KINDS:
+        before, after = old.get(kind, {}), new.get(kind, {})
+        changed = {i: h for i, h in after.items() if before.get(i) != h}
+        deleted = [i for i in before if i not in after]
+        if changed:
+            diff["set"][kind] = changed
+        if deleted:
+            diff["del"][kind] = deleted
+    return diff
+
+def diff_size(diff):
+    return sum(len(v) for part in diff.values() for v in part.values())
+
+# ------------ RECORDER ------------
+class _Pending:
+    __slots__ = ("set", "deleted")
+
+    def __init__(self):
+        self.set = {kind: {} for kind in KINDS}
+        self.deleted = {kind: set() for kind in KINDS}
+
+class SnapshotRecorder:
+    """Keeps each guild's current structure hashes and writes snapshots.
+
+    ``capture`` takes a full snapshot the first time a guild is seen (or a
+    diff against the stored one after a restart). After that, ``observe``
+    and ``remove`` are fed from create/update/delete events and only the
+    objects that actually changed are written, batched every ``interval``
+    seconds. A full snapshot replaces the increments every ``full_every``
+    writes so rebuilding a state never replays a long chain. Every
+    ``collect_every`` seconds the store drops blobs that pruning left
+    unreferenced.
+    """
+
+    def __init__(self, store, interval=SNAPSHOT_INTERVAL, full_every=FULL_EVERY, known_blobs=200_000,
+                 collect_every=COLLECT_INTERVAL):
+        self.store = store
+        self.interval = interval
+        self.full_every = full_every
+        self.collect_every = collect_every
+        self._next_collect = time.monotonic() + collect_every
+        self._state = {}      # guild_id: {kind: {object id: hash}}
+        self._chain = {}      # guild_id: increments since the last full snapshot
+        self._pending = {}    # guild_id: _Pending
+        self._capturing = set()
+        self._blobs = {}      # hash: JSON bytes waiting to be written
+        self._known = OrderedDict()   # hashes already written, to skip re-sending them
+        self._known_max = known_blobs
+        self._captures = asyncio.Queue()
+        self._queued = set()
+        self._tasks = []
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._capture_worker()), asyncio.create_task(self._flush_loop())]
+
+    def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+    def tracked(self, guild_id):
+        return guild_id in self._state
+
+    def state(self, guild_id):
+        return self._state.get(guild_id)
+
+    def queue_capture(self, guild):
+        if guild.id not in self._queued:
+            self._queued.add(guild.id)
+            self._captures.put_nowait(guild)
+
+    def _hash(self, record):
+        digest, data = encode(record)
+        if digest not in self._known:
+            self._blobs[digest] = data
+        return digest
+
+    def _mark_known(self, hashes):
+        known = self._known
+        for digest in hashes:
+            known[digest] = None
+            known.move_to_end(digest)
+        while len(known) > self._known_max:
+            known.popitem(last=False)
+
+    def observe(self, kind, obj):
+        """Record the current state of a created or updated role/channel."""
+        state = self._state.get(obj.guild.id)
+        if state is None:
+            return
+        object_id = str(obj.id)
+        digest = self._hash(RECORDERS[kind](obj))
+        if state[kind].get(object_id) == digest:
+            return
+        state[kind][object_id] = digest
+        pending = self._pending.setdefault(obj.guild.id, _Pending())
+        pending.set[kind][object_id] = digest
+        pending.deleted[kind].discard(object_id)
+
+    def remove(self, kind, obj):
+        state = self._state.get(obj.guild.id)
+        object_id = str(obj.id)
+        if state is None or state[kind].pop(object_id, None) is None:
+            return
+        pending = self._pending.setdefault(obj.guild.id, _Pending())
+        pending.set[kind].pop(object_id, None)
+        pending.deleted[kind].add(object_id)
+
+    def drop(self, guild_id):
+        self._state.pop(guild_id, None)
+        self._chain.pop(guild_id, None)
+        self._pending.pop(guild_id, None)
+
+    async def capture(self, guild):
+        """Full capture; stored as a diff when an earlier snapshot exists."""
+        current = {kind: {i: self._hash(r) for i, r in records.items()} for kind, records in capture(guild).items()}
+        # Events arriving from here on update ``current``; their diffs wait until this capture is stored
+        self._state[guild.id] = current
+        self._pending.pop(guild.id, None)
+        self._capturing.add(guild.id)
+        try:
+            stored, chain, _ = await self.store.state(guild.id)
+            if stored is None or chain + 1 >= self.full_every:
+                await self._write(guild.id, True, current, sum(len(v) for v in current.values()))
+                self._chain[guild.id] = 0
+                return
+            self._chain[guild.id] = chain
+            diff = diff_states(stored, current)
+            if diff_size(diff):
+                await self._write(guild.id, False, diff, diff_size(diff))
+                self._chain[guild.id] += 1
+        finally:
+            self._capturing.discard(guild.id)
+
+    async def _write(self, guild_id, full, body, changes):
+        if full:
+            # Serialized on the store's thread, so hand it a copy the loop will not mutate
+            body = {kind: dict(items) for kind, items in body.items()}
+        blobs, self._blobs = self._blobs, {}
+        try:
+            await self.store.write(guild_id, full, body, changes, blobs)
+        except Exception:
+            self._blobs.update(blobs)
+            raise
+        self._mark_known(blobs)
+
+    async def flush(self, guild_ids=None):
+        """Write pending increments, for every guild or only ``guild_ids``."""
+        if guild_ids is None:
+            pending, self._pending = self._pending, {}
+        else:
+            pending = {gid: self._pending.pop(gid) for gid in guild_ids if gid in self._pending}
+        for guild_id, changes in pending.items():
+            state = self._state.get(guild_id)
+            if state is None:
+                continue
+            if guild_id in self._capturing:
+                self._pending.setdefault(guild_id, changes)
+                continue
+            try:
+                if self._chain.get(guild_id, 0) + 1 >= self.full_every:
+                    await self._write(guild_id, True, state, sum(len(v) for v in state.values()))
+                    self._chain[guild_id] = 0
+                    continue
+                diff = {
+                    "set": {k: v for k, v in changes.set.items() if v},
+                    "del": {k: sorted(v) for k, v in changes.deleted.items() if v},
+                }
+                if diff_size(diff):
+                    await self._write(guild_id, False, diff, diff_size(diff))
+                    self._chain[guild_id] = self._chain.get(guild_id, 0) + 1
+            except Exception as e:
+                print(f"Error writing snapshot for guild {guild_id}: {e}")
+
+    async def collect(self):
+        """Sweep unreferenced blobs, keeping every hash a guild currently holds."""
+        live = {digest for state in self._state.values() for items in state.values() for digest in items.values()}
+        # Hashes outside the live set may be swept, so they must be written again if they come back
+        self._known = OrderedDict.fromkeys(live)
+        while len(self._known) > self._known_max:
+            self._known.popitem(last=False)
+        return await self.store.collect(live)
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+            if time.monotonic() >= self._next_collect:
+                self._next_collect = time.monotonic() + self.collect_every
+                try:
+                    await self.collect()
+                except Exception as e:
+                    print(f"Error collecting snapshot blobs: {e}")
+
+    async def _capture_worker(self):
+        # Startup brings thousands of guilds at once; capture them one at a time
+        while True:
+            guild = await self._captures.get()
+            self._queued.discard(guild.id)
+            try:
+                await self.capture(guild)
+            except Exception as e:
+                print(f"Error capturing snapshot for guild {guild.id}: {e}")
@@ -0,0 +1,59 @@
+import time
+from collections import OrderedDict, deque
+
+class SpamWindow:
+    """Sliding-window message counter keyed by (guild_id, user_id).
+
+    Each key owns a fixed-size ring buffer of monotonic timestamps, so a
+    hit is O(1) regardless of how chatty the user is. Keys idle for longer
+    than ``idle_ttl`` seconds are evicted, and the table never holds more
+    than ``max_entries`` keys (least recently active go first).
+    """
+
+    def __init__(self, max_messages=5, interval=3.0, idle_ttl=60.0, max_entries=50_000):
+        self.max_messages = max_messages
+        self.interval = interval
+        self.idle_ttl = idle_ttl
+        self.max_entries = max_entries
+        self._windows = OrderedDict()
+
+    def hit(self, guild_id, user_id, max_messages=None, interval=None):
+        """Record a message; return True when the user exceeds the limit."""
+        max_messages = max_messages or self.max_messages
+        interval = interval or self.interval
+        now = time.monotonic()
+        key = (guild_id, user_id)
+
+        ring = self._windows.get(key)
+        if ring is None or ring.maxlen != max_messages + 1:
+            ring = deque(ring or (), maxlen=max_messages + 1)
+            self._windows[key] = ring
+        else:
+            self._windows.move_to_end(key)
+        ring.append(now)
+        self._evict(now)
+
+        if len(ring) == ring.maxlen and now - ring[0] < interval:
+            ring.clear()
+            return True
+        return False
+
+    def forget(self, guild_id, user_id=None):
+        if user_id is not None:
+            self._windows.pop((guild_id, user_id), None)
+            return
+        for key in [k for k in self._windows if k[0] == guild_id]:
+            del self._windows[key]
+
+    def _evict(self, now):
+        windows = self._windows
+        while len(windows) > self.max_entries:
+            windows.popitem(last=False)
+        while windows:
+            key, ring = next(iter(windows.items()))
+            if ring and now - ring[-1] < self.idle_ttl:
+                break
+            del windows[key]
+
+    def __len__(self):
+        return len(self._windows)
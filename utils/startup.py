@@ -0,0 +1,56 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+
+TREE_HASH_FILE = os.environ.get("SECUREAURA_TREE_HASH", "command_tree.sha256")
+
+def command_tree_fingerprint(bot):
+    """SHA-256 of the serialized global command tree for this application."""
+    payload = [cmd.to_dict(bot.tree) for cmd in bot.tree.get_commands()]
+    payload.sort(key=lambda c: (c.get("type", 1), c["name"]))
+    raw = json.dumps([bot.application_id, payload], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+async def sync_command_tree(bot, force=False):
+    """Sync slash commands only when their definitions changed since the last sync.
+
+    Returns the number of synced commands, or None when the sync was skipped.
+    """
+    fingerprint = command_tree_fingerprint(bot)
+    previous = None
+    if os.path.exists(TREE_HASH_FILE):
+        with open(TREE_HASH_FILE, "r") as f:
+            previous = f.read().strip()
+    if fingerprint == previous and not force:
+        return None
+    synced = await bot.tree.sync()
+    with open(TREE_HASH_FILE, "w") as f:
+        f.write(fingerprint)
+    return len(synced)
+
+async def load_extensions_concurrently(bot, extensions):
+    """Load extensions concurrently and return {extension: seconds}.
+
+    Each entry times the whole ``load_extension`` call, import included.
+    Any setup that awaits overlaps with the others. A failure is reported
+    and re-raised once every load has finished, so the bot never starts
+    with a cog missing.
+    """
+    timings = {}
+
+    async def load(ext):
+        start = time.perf_counter()
+        try:
+            await bot.load_extension(ext)
+        except Exception as e:
+            print(f"Error loading {ext}: {e}")
+            raise
+        timings[ext] = time.perf_counter() - start
+
+    results = await asyncio.gather(*(load(ext) for ext in extensions), return_exceptions=True)
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return timings
@@ -0,0 +1,232 @@
+import asyncio
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from utils.persistence import persistence
+
+# table name: legacy JSON file
+TABLES = {
+    "whitelists": "whitelists.json",
+    "premium": "premium_servers.json",
+    "greets": "greet_settings.json",
+    "log_channels": "log_channels.json",
+    "settings": "guild_settings.json",
+    "nuke_limits": "nuke_limits.json",
+}
+
+STORAGE_BACKEND = os.environ.get("SECUREAURA_STORAGE", "json").lower()
+SQLITE_PATH = os.environ.get("SECUREAURA_DB", "secureaura.db")
+CHANGE_POLL_INTERVAL = 0.5   # seconds between checks for writes from other processes
+CHANGE_RETENTION = 300       # seconds a change stays in the changes table
+
+class JsonStorage:
+    """One JSON file per table, written through the write-behind queue."""
+
+    def load(self, table):
+        return persistence.load(TABLES[table], {})
+
+    def save(self, table, producer, rows=None, **dump_kwargs):
+        # JSON files can only be rewritten whole, so ``rows`` is ignored
+        persistence.schedule(TABLES[table], producer, **dump_kwargs)
+
+    def subscribe(self, table, callback):
+        # A single process owns the JSON files, so there is nothing to follow
+        pass
+
+    def unsubscribe(self, table, callback):
+        pass
+
+    async def flush(self):
+        await persistence.flush()
+
+class SqliteStorage:
+    """SQLite (WAL) storage with one row per guild in each table.
+
+    Every statement runs on a single worker thread, so writes never block
+    the event loop and are applied in the order they were issued. On first
+    open the legacy JSON files are imported once.
+
+    Each write is also appended to a ``changes`` table. Processes sharing
+    the database (see cluster.py) poll it and hand rows written by others
+    to the callbacks registered with ``subscribe``.
+    """
+
+    def __init__(self, path=SQLITE_PATH):
+        self.path = path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+        self._local = threading.local()
+        self._last = None
+        self._origin = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._subscribers = defaultdict(list)
+        self._poller = None
+        self._call(self._init_schema)
+        self._last_change = self._call(self._max_change_id)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _call(self, fn, *args):
+        return self._executor.submit(fn, *args).result()
+
+    def _submit(self, fn, *args):
+        def run():
+            try:
+                fn(*args)
+            except Exception as e:
+                print(f"Error writing to {self.path}: {e}")
+        self._last = self._executor.submit(run)
+
+    def _init_schema(self):
+        conn = self._conn()
+        with conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            for table in TABLES:
+                conn.execute(f"CREATE TABLE IF NOT EXISTS {table} (guild_id TEXT PRIMARY KEY, data TEXT NOT NULL)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS changes (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "tbl TEXT NOT NULL, guild_id TEXT, origin TEXT NOT NULL, ts REAL NOT NULL)"
+            )
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'json_imported'").fetchone() is None:
+            self._import_json()
+
+    def _import_json(self):
+        conn = self._conn()
+        with conn:
+            for table, path in TABLES.items():
+                if not os.path.exists(path):
+                    continue
+                with open(path, "r") as f:
+                    data = json.load(f)
+                conn.executemany(
+                    f"INSERT OR REPLACE INTO {table} (guild_id, data) VALUES (?, ?)",
+                    [(str(gid), json.dumps(value, default=str)) for gid, value in data.items()]
+                )
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('json_imported', '1')")
+
+    def import_json(self):
+        """Re-run the JSON import, overwriting rows for guilds in the files."""
+        self._call(self._import_json)
+
+    def load(self, table):
+        def read():
+            rows = self._conn().execute(f"SELECT guild_id, data FROM {table}").fetchall()
+            return {gid: json.loads(data) for gid, data in rows}
+        return self._call(read)
+
+    def save(self, table, producer, rows=None, **dump_kwargs):
+        if rows is None:
+            data = producer()
+            self._submit(self._replace, table, {str(k): json.dumps(v, default=str) for k, v in data.items()})
+        else:
+            rows = {str(k): None if v is None else json.dumps(v, default=str) for k, v in rows.items()}
+            self._submit(self._upsert, table, rows)
+
+    def _replace(self, table, rows):
+        conn = self._conn()
+        with conn:
+            conn.execute(f"DELETE FROM {table}")
+            conn.executemany(f"INSERT INTO {table} (guild_id, data) VALUES (?, ?)", rows.items())
+            conn.executemany(
+                "INSERT INTO changes (tbl, guild_id, origin, ts) VALUES (?, ?, ?, ?)",
+                [(table, gid, self._origin, time.time()) for gid in rows]
+            )
+
+    def _upsert(self, table, rows):
+        conn = self._conn()
+        with conn:
+            for gid, data in rows.items():
+                if data is None:
+                    conn.execute(f"DELETE FROM {table} WHERE guild_id = ?", (gid,))
+                else:
+                    conn.execute(
+                        f"INSERT INTO {table} (guild_id, data) VALUES (?, ?) "
+                        f"ON CONFLICT(guild_id) DO UPDATE SET data = excluded.data",
+                        (gid, data)
+                    )
+                conn.execute(
+                    "INSERT INTO changes (tbl, guild_id, origin, ts) VALUES (?, ?, ?, ?)",
+                    (table, gid, self._origin, time.time())
+                )
+
+    # ------------ CROSS-PROCESS CHANGE FEED ------------
+    def subscribe(self, table, callback):
+        """Call ``callback(guild_id, value)`` when another process writes ``table``.
+
+        ``value`` is the row's new data, or None when the row was deleted.
+        Callbacks run on the event loop.
+        """
+        self._subscribers[table].append(callback)
+        if self._poller is None:
+            try:
+                self._poller = asyncio.get_running_loop().create_task(self._poll_changes())
+            except RuntimeError:
+                pass
+
+    def unsubscribe(self, table, callback):
+        if callback in self._subscribers.get(table, ()):
+            self._subscribers[table].remove(callback)
+
+    def _max_change_id(self):
+        row = self._conn().execute("SELECT MAX(id) FROM changes").fetchone()
+        return row[0] or 0
+
+    def _read_changes(self, since):
+        conn = self._conn()
+        rows = conn.execute(
+            "SELECT id, tbl, guild_id FROM changes WHERE id > ? AND origin != ? ORDER BY id",
+            (since, self._origin)
+        ).fetchall()
+        last = max([since] + [r[0] for r in rows])
+        changed = {}
+        for _, table, gid in rows:
+            if table in TABLES:
+                found = conn.execute(f"SELECT data FROM {table} WHERE guild_id = ?", (gid,)).fetchone()
+                changed[(table, gid)] = json.loads(found[0]) if found else None
+        if rows:
+            with conn:
+                conn.execute("DELETE FROM changes WHERE ts < ?", (time.time() - CHANGE_RETENTION,))
+        return last, changed
+
+    async def _poll_changes(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(CHANGE_POLL_INTERVAL)
+            try:
+                self._last_change, changed = await loop.run_in_executor(self._executor, self._read_changes, self._last_change)
+            except Exception as e:
+                print(f"Error reading changes from {self.path}: {e}")
+                continue
+            for (table, gid), value in changed.items():
+                for callback in self._subscribers.get(table, ()):
+                    try:
+                        callback(gid, value)
+                    except Exception as e:
+                        print(f"Error applying {table} change for {gid}: {e}")
+
+    async def flush(self):
+        if self._last is not None:
+            await asyncio.wrap_future(self._last)
+
+    def flush_sync(self):
+        if self._last is not None:
+            self._last.result()
+
+def open_storage():
+    if STORAGE_BACKEND == "sqlite":
+        store = SqliteStorage()
+        atexit.register(store.flush_sync)
+        return store
+    return JsonStorage()
+
+storage = open_storage()